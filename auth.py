@@ -1,13 +1,17 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import hashlib
 import os
+import threading
+from cachetools import LRUCache
 from jose import JWTError, jwt
+from jose.exceptions import JWTClaimsError
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from models import User
+from models import User, UserCredentials
 from database import get_db
 from repositories.users_repository import UsersRepository
 
@@ -22,6 +26,11 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # JWT Bearer token
 security = HTTPBearer()
 
+# Digests of tokens that already failed verification in a way that can never
+# change (bad signature, malformed, or expired), so repeats skip the decode.
+_rejected_tokens: LRUCache = LRUCache(maxsize=10_000)
+_rejected_lock = threading.Lock()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -48,10 +57,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token"""
+    # A compact JWS is always header.payload.signature; anything else can't decode
+    if token.count(".") != 2:
+        return None
+    digest = hashlib.sha256(token.encode()).digest()
+    with _rejected_lock:
+        if digest in _rejected_tokens:
+            return None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
+    except JWTClaimsError:
+        # e.g. nbf still in the future: the same token can become valid later
+        return None
     except JWTError:
+        with _rejected_lock:
+            _rejected_tokens[digest] = True
         return None
 
 
@@ -88,10 +109,10 @@ def get_current_user(
     return user
 
 
-def authenticate_user(email: str, password: str, db: Session) -> Optional[User]:
+def authenticate_user(email: str, password: str, db: Session) -> Optional[UserCredentials]:
     """Authenticate a user with email and password"""
     user_repo = UsersRepository(db)
-    user = user_repo.get_by_email(email)
+    user = user_repo.get_by_email_for_auth(email)
     if not user:
         return None
     if not verify_password(password, user.password):
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
@@ -30,7 +31,8 @@ async def login(
     try:
         logger.info("Login attempt", email=login_data.email)
         
-        user = service.verify_user_password(login_data.email, login_data.password)
+        # bcrypt verification is CPU-bound; keep it off the event loop
+        user = await run_in_threadpool(service.verify_user_password, login_data.email, login_data.password)
         
         if not user:
             logger.warning("Login failed - invalid credentials", email=login_data.email)
@@ -25,10 +25,8 @@ async def list_bookings(
     current_user: User = Depends(get_current_user),
     service: BookingsService = Depends(get_booking_layer),
 ):
-    # If no customerId provided, use current user's email
-    if not customerId:
-        customerId = current_user.email
-    return service.list_bookings(customer_id=customerId, provider_id=providerId)
+    # Only bookings the current user takes part in; the filters narrow that set, never widen it
+    return service.list_bookings_for_user(current_user, customer_id=customerId, provider_id=providerId)
 
 
 @router.get("/{booking_id}", response_model=BookingResponse)
@@ -67,7 +65,14 @@ async def create_booking(
     service: BookingsService = Depends(get_booking_layer)
 ):
     """Create a booking with mandatory payment processing - payment must succeed before booking is created"""
-    result = service.create_booking(current_user.email, payload)
+    try:
+        result = service.create_booking(current_user, payload)
+    except ValueError:
+        # A foreign key failed, e.g. the customer or service was deleted mid-request
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking creation failed. The customer or service no longer exists."
+        )
     if not result:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
@@ -84,7 +89,7 @@ async def update_booking(
     service: BookingsService = Depends(get_booking_layer)
 ):
     """Update a booking - authorization handled in service layer"""
-    result = service.update_booking(booking_id, payload, current_user.email)
+    result = service.update_booking(booking_id, payload, current_user)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -100,7 +105,7 @@ async def delete_booking(
     service: BookingsService = Depends(get_booking_layer)
 ):
     """Delete a booking - authorization handled in service layer"""
-    deleted = service.delete_booking(booking_id, current_user.email)
+    deleted = service.delete_booking(booking_id, current_user)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -15,10 +15,11 @@ def get_email_service() -> EmailService:
 @router.get("/history")
 async def get_email_history(
     user_email: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     service: EmailService = Depends(get_email_service)
 ):
     """Get email notification history (for testing/debugging)"""
-    emails = service.get_email_history(user_email)
+    emails = service.get_email_history(user_email, limit)
     return {
         "count": len(emails),
         "emails": emails
@@ -61,14 +62,11 @@ async def test_email_service(service: EmailService = Depends(get_email_service))
     service_obj = Service(
         id="test-service-id",
         providerId="provider@test.com",
-        title="Test Service",
+        name="Test Service",
         description="A test service for email notifications",
-        category="test",
         price=50.0,
-        currency="USD",
-        duration=60,
-        availability=ServiceAvailability(monday=["09:00", "17:00"]),
-        images=[]
+        durationMinutes=60,
+        availability=ServiceAvailability(monday=["09:00", "17:00"])
     )
     
     booking = Booking(
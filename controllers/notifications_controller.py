@@ -19,13 +19,9 @@ def get_notifications_service(db: Session = Depends(get_db)) -> NotificationsSer
 @router.get("/stream")
 async def stream_notifications(
     request: Request,
-    current_user = Depends(get_current_user),
-    notifications_service: NotificationsService = Depends(get_notifications_service)
+    current_user = Depends(get_current_user)
 ):
     """Stream real-time notifications via Server-Sent Events"""
-    # Set the notifications service in the SSE manager
-    sse_manager.set_notifications_service(notifications_service)
-    
     # Create SSE connection for the current user
     return await sse_manager.add_connection(current_user.email, request)
 
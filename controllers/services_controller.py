@@ -12,6 +12,9 @@ from rate_limiter import browsing_rate_limit
 
 router = APIRouter(prefix="/services", tags=["services"])
 
+# Upper bound on the number of services one batch request may create or delete
+MAX_BATCH_SIZE = 100
+
 
 def get_service_layer(db: Session = Depends(get_db)) -> ServicesService:
     return ServicesService(ServicesRepository(db), UsersRepository(db))
@@ -58,6 +61,27 @@ async def create_service(
     
     return service.create_service(current_user.email, payload)
 
+# Create several services at once, only service providers can create services
+@router.post("/batch", response_model=List[ServiceResponse], status_code=status.HTTP_201_CREATED)
+async def create_services_batch(
+    payloads: List[ServiceCreateRequest],
+    service: ServicesService = Depends(get_service_layer),
+    current_user: User = Depends(get_current_user)
+):
+    """Create several services in one request - only service providers can create services"""
+    if current_user.role != UserRole.PROVIDER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only service providers can create services"
+        )
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can create at most {MAX_BATCH_SIZE} services"
+        )
+    
+    return service.create_services_batch(current_user.email, payloads)
+
 # Update a service, only the service owner can update their own service
 @router.put("/{service_id}", response_model=ServiceResponse)
 async def update_service(
@@ -82,6 +106,27 @@ async def update_service(
         )
     return result
 
+# Delete several services at once, only the owner's services are deleted
+@router.delete("/batch", response_model=List[str])
+async def delete_services_batch(
+    ids: List[str] = Query(...),
+    service: ServicesService = Depends(get_service_layer),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete several services in one request - ids the provider doesn't own are skipped; returns the deleted ids"""
+    if current_user.role != UserRole.PROVIDER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only service providers can delete services"
+        )
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can delete at most {MAX_BATCH_SIZE} services"
+        )
+    
+    return service.delete_services_batch(ids, current_user.email)
+
 # Delete a service, only the service owner can delete their own service
 @router.delete("/{service_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_service(
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -105,7 +106,9 @@ async def register_user(
     try:
         logger.info("User registration attempt", email=payload.email, role=payload.role)
         
-        result = service.create_user(payload)
+        # bcrypt hashing (plus the blocking DB calls) would stall the event loop and every
+        # open SSE stream, so run the sync service on the threadpool
+        result = await run_in_threadpool(service.create_user, payload)
         
         if not result:
             logger.warning("User registration failed - email already exists", email=payload.email)
@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from contextlib import contextmanager
+from typing import Callable
 import os
 from dotenv import load_dotenv
 
@@ -24,3 +26,64 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def transaction(db: Session):
+    """Own the transaction boundary for a unit of work.
+
+    Repositories never commit; services wrap their writes in this block instead.
+    Blocks nest: only the outermost one commits (or rolls back on error), so a
+    service that calls another service still issues a single COMMIT.
+    """
+    depth = db.info.get("transaction_depth", 0)
+    db.info["transaction_depth"] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except Exception:
+        if depth == 0:
+            db.rollback()
+            db.info.pop("after_commit", None)
+        raise
+    finally:
+        db.info["transaction_depth"] = depth
+    if depth == 0:
+        for callback in db.info.pop("after_commit", []):
+            callback()
+
+
+@contextmanager
+def savepoint(db: Session):
+    """SAVEPOINT inside the current transaction, released when the block exits.
+
+    Rolling it back - by raising, or explicitly via the yielded transaction -
+    also drops the after_commit callbacks queued inside it.
+    """
+    pending = db.info.setdefault("after_commit", [])
+    mark = len(pending)
+    nested = db.begin_nested()
+    try:
+        yield nested
+    except Exception:
+        if nested.is_active:
+            nested.rollback()
+        del pending[mark:]
+        raise
+    if nested.is_active:
+        nested.commit()
+    else:
+        del pending[mark:]
+
+
+def after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """Run callback once the outermost transaction() on db has committed.
+
+    Outside a transaction block it runs straight away; if the transaction
+    rolls back the callback is dropped.
+    """
+    if db.info.get("transaction_depth", 0) == 0:
+        callback()
+    else:
+        db.info.setdefault("after_commit", []).append(callback)
@@ -43,4 +43,4 @@ python migrate.py --action seed
 
 # Start the FastAPI application
 echo "🚀 Starting FastAPI application..."
-exec uvicorn main:app --host 0.0.0.0 --port 8000
+exec uvicorn main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
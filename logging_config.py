@@ -4,6 +4,8 @@ Provides centralized logging setup with proper levels and formatting
 """
 
 import os
+import time
+import threading
 import logging
 import logging.handlers
 from pathlib import Path
@@ -182,5 +184,28 @@ def log_business_event(event_type: str, entity_type: str, entity_id: str = None,
         **kwargs
     )
 
+# event -> [tokens, last refill time, suppressed count] for log_throttled
+_throttle_buckets: Dict[str, list] = {}
+_throttle_lock = threading.Lock()
+
+def log_throttled(logger: structlog.BoundLogger, event: str, per_second: float = 5.0, **kwargs) -> None:
+    """Log a warning through a per-event token bucket so an outage can't flood the logs.
+
+    Warnings over the rate are counted, and the count is attached to the next one logged.
+    """
+    now = time.monotonic()
+    with _throttle_lock:
+        bucket = _throttle_buckets.setdefault(event, [per_second, now, 0])
+        bucket[0] = min(per_second, bucket[0] + (now - bucket[1]) * per_second)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return
+        bucket[0] -= 1
+        suppressed, bucket[2] = bucket[2], 0
+    if suppressed:
+        kwargs["suppressed"] = suppressed
+    logger.warning(event, **kwargs)
+
 # Initialize logging when module is imported
 setup_logging()
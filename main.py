@@ -47,4 +47,6 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     
-    uvicorn.run(app, host=host, port=port)
+    # Pin the uvloop event loop and httptools parser (both ship with uvicorn[standard])
+    # so a missing extra fails loudly instead of silently falling back to asyncio/h11
+    uvicorn.run(app, host=host, port=port, loop="uvloop", http="httptools")
@@ -39,6 +39,14 @@ class User(BaseModel):
         }
 
 
+class UserCredentials(BaseModel):
+    """Just the columns needed to check a login (no profile)"""
+    id: str
+    email: EmailStr
+    password: str
+    role: UserRole
+
+
 class ServiceAvailability(BaseModel):
     monday: Optional[List[str]] = None
     tuesday: Optional[List[str]] = None
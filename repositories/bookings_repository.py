@@ -4,15 +4,21 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text, insert, select, update, delete
 from sqlalchemy.exc import IntegrityError
 
-from models import Booking
+from models import Booking, BookingStatus
 
 
+# Order must match the positional unpack in _row_to_model
+BOOKING_COLUMNS = "id, customer_id, service_id, provider_id, status, scheduled_at, duration_minutes, total_amount, notes, created_at, updated_at"
+
+# Restricts a statement to bookings where :user_id is the customer or the provider
+FOR_PARTICIPANT = "(customer_id = :user_id OR provider_id = :user_id)"
+
 class BookingsRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def list_bookings(self, customer_id: Optional[str] = None, provider_id: Optional[str] = None) -> List[Booking]:
-        query = select(text("*")).select_from(text("bookings"))
+        query = select(text(BOOKING_COLUMNS)).select_from(text("bookings"))
         params = {}
         
         if customer_id:
@@ -25,21 +31,37 @@ class BookingsRepository:
         result = self.db.execute(query, params)
         return [self._row_to_model(row) for row in result]
 
+    def list_bookings_for_participant(self, user_id: str, customer_id: Optional[str] = None,
+                                      provider_id: Optional[str] = None) -> List[Booking]:
+        """Bookings where the user is the customer or the provider, optionally narrowed further, in one query"""
+        query = select(text(BOOKING_COLUMNS)).select_from(text("bookings")).where(text(FOR_PARTICIPANT))
+        params = {"user_id": user_id}
+        
+        if customer_id:
+            query = query.where(text("customer_id = :customer_id"))
+            params["customer_id"] = customer_id
+        if provider_id:
+            query = query.where(text("provider_id = :provider_id"))
+            params["provider_id"] = provider_id
+        
+        result = self.db.execute(query, params)
+        return [self._row_to_model(row) for row in result]
+
     def get_booking(self, booking_id: str) -> Optional[Booking]:
-        query = select(text("*")).select_from(text("bookings")).where(text("id = :booking_id"))
-        result = self.db.execute(query, {"booking_id": booking_id}).fetchone()
+        query = select(text(BOOKING_COLUMNS)).select_from(text("bookings")).where(text("id = :booking_id"))
+        result = self.db.execute(query, {"booking_id": booking_id}).first()
         return self._row_to_model(result) if result else None
 
     def create_booking(self, booking: Booking) -> Booking:
         try:
-            query = text("""
+            query = text(f"""
                 INSERT INTO bookings (id, customer_id, service_id, provider_id, status,
                                     scheduled_at, duration_minutes, total_amount, notes,
                                     created_at, updated_at)
                 VALUES (:id, :customer_id, :service_id, :provider_id, :status,
                         :scheduled_at, :duration_minutes, :total_amount, :notes,
                         :created_at, :updated_at)
-                RETURNING *
+                RETURNING {BOOKING_COLUMNS}
             """)
             
             result = self.db.execute(query, {
@@ -54,16 +76,14 @@ class BookingsRepository:
                 "notes": booking.notes,
                 "created_at": booking.createdAt,
                 "updated_at": booking.updatedAt
-            }).fetchone()
-            self.db.commit()
+            }).first()
             return self._row_to_model(result)
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Booking creation failed: {str(e)}") from e
 
     def update_booking(self, booking_id: str, updated: Booking) -> Optional[Booking]:
         try:
-            query = text("""
+            query = text(f"""
                 UPDATE bookings 
                 SET customer_id = :customer_id,
                     service_id = :service_id,
@@ -75,7 +95,7 @@ class BookingsRepository:
                     notes = :notes,
                     updated_at = :updated_at
                 WHERE id = :booking_id
-                RETURNING *
+                RETURNING {BOOKING_COLUMNS}
             """)
             
             result = self.db.execute(query, {
@@ -89,36 +109,47 @@ class BookingsRepository:
                 "total_amount": updated.totalAmount,
                 "notes": updated.notes,
                 "updated_at": datetime.now(timezone.utc)
-            }).fetchone()
+            }).first()
             
             if not result:
                 return None
-            self.db.commit()
             return self._row_to_model(result)
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Booking update failed: {str(e)}") from e
 
+    def set_status(self, booking_id: str, status: BookingStatus) -> Optional[Booking]:
+        query = text(f"""
+            UPDATE bookings SET status = :status, updated_at = NOW()
+            WHERE id = :booking_id
+            RETURNING {BOOKING_COLUMNS}
+        """)
+        result = self.db.execute(query, {"booking_id": booking_id, "status": status.value}).first()
+        return self._row_to_model(result) if result else None
+
     def delete_booking(self, booking_id: str) -> bool:
         query = text("DELETE FROM bookings WHERE id = :booking_id RETURNING id")
-        result = self.db.execute(query, {"booking_id": booking_id}).fetchone()
-        if result:
-            self.db.commit()
-            return True
-        return False
+        result = self.db.execute(query, {"booking_id": booking_id}).first()
+        return result is not None
+
+    def delete_booking_for_participant(self, booking_id: str, user_id: str) -> bool:
+        """Delete a booking only if the user is its customer or provider, in one statement"""
+        query = text(f"DELETE FROM bookings WHERE id = :booking_id AND {FOR_PARTICIPANT} RETURNING id")
+        result = self.db.execute(query, {"booking_id": booking_id, "user_id": user_id}).first()
+        return result is not None
 
     def _row_to_model(self, row) -> Booking:
-        from models import BookingStatus
+        (id_, customer_id, service_id, provider_id, status, scheduled_at,
+         duration_minutes, total_amount, notes, created_at, updated_at) = row
         return Booking(
-            id=str(row.id),
-            customerId=str(row.customer_id),
-            serviceId=str(row.service_id),
-            providerId=str(row.provider_id),
-            status=BookingStatus(row.status),
-            scheduledAt=row.scheduled_at,
-            duration=row.duration_minutes,
-            totalAmount=float(row.total_amount),
-            notes=row.notes,
-            createdAt=row.created_at,
-            updatedAt=row.updated_at
+            id=str(id_),
+            customerId=str(customer_id),
+            serviceId=str(service_id),
+            providerId=str(provider_id),
+            status=BookingStatus(status),
+            scheduledAt=scheduled_at,
+            duration=duration_minutes,
+            totalAmount=float(total_amount),
+            notes=notes,
+            createdAt=created_at,
+            updatedAt=updated_at
         )
\ No newline at end of file
@@ -29,7 +29,6 @@ class NotificationsRepository:
             "created_at": notification.createdAt,
             "read_at": notification.readAt
         })
-        self.db.commit()
         return notification
 
     def get_notifications_by_user(self, user_id: str, limit: int = 50, offset: int = 0) -> List[NotificationResponse]:
@@ -46,7 +45,7 @@ class NotificationsRepository:
             "user_id": user_id,
             "limit": limit,
             "offset": offset
-        }).fetchall()
+        }).all()
         
         return [self._row_to_model(row) for row in result]
 
@@ -59,7 +58,7 @@ class NotificationsRepository:
             ORDER BY created_at DESC
         """)
         
-        result = self.db.execute(query, {"user_id": user_id}).fetchall()
+        result = self.db.execute(query, {"user_id": user_id}).all()
         return [self._row_to_model(row) for row in result]
 
     def mark_notification_as_read(self, notification_id: str, user_id: str) -> bool:
@@ -75,7 +74,6 @@ class NotificationsRepository:
             "user_id": user_id,
             "read_at": datetime.now(timezone.utc)
         })
-        self.db.commit()
         return result.rowcount > 0
 
     def mark_all_notifications_as_read(self, user_id: str) -> int:
@@ -90,7 +88,6 @@ class NotificationsRepository:
             "user_id": user_id,
             "read_at": datetime.now(timezone.utc)
         })
-        self.db.commit()
         return result.rowcount
 
     def delete_notification(self, notification_id: str, user_id: str) -> bool:
@@ -104,7 +101,6 @@ class NotificationsRepository:
             "notification_id": notification_id,
             "user_id": user_id
         })
-        self.db.commit()
         return result.rowcount > 0
 
     def get_notification_count(self, user_id: str) -> dict:
@@ -117,22 +113,23 @@ class NotificationsRepository:
             WHERE user_id = :user_id
         """)
         
-        result = self.db.execute(query, {"user_id": user_id}).fetchone()
+        result = self.db.execute(query, {"user_id": user_id}).mappings().first()
         return {
-            "total": result.total,
-            "unread": result.unread
+            "total": result["total"],
+            "unread": result["unread"]
         }
 
     def _row_to_model(self, row) -> NotificationResponse:
         """Convert database row to NotificationResponse model"""
+        (id_, user_id, type_, title, message, data, is_read, created_at, read_at) = row
         return NotificationResponse(
-            id=str(row.id),
-            userId=str(row.user_id),
-            type=row.type,
-            title=row.title,
-            message=row.message,
-            data=json.loads(row.data) if row.data else None,
-            isRead=row.is_read,
-            createdAt=row.created_at,
-            readAt=row.read_at
-        )
+            id=str(id_),
+            userId=str(user_id),
+            type=type_,
+            title=title,
+            message=message,
+            data=json.loads(data) if data else None,
+            isRead=is_read,
+            createdAt=created_at,
+            readAt=read_at
+        )
\ No newline at end of file
@@ -8,6 +8,9 @@ from datetime import datetime, timezone, timedelta
 from models import PasswordResetToken
 
 
+# Order must match the positional unpack in _row_to_model
+RESET_TOKEN_COLUMNS = "id, email, token, expires_at, is_used, created_at"
+
 class PasswordResetRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -35,22 +38,20 @@ class PasswordResetRepository:
                 "is_used": reset_token.isUsed,
                 "created_at": reset_token.createdAt
             })
-            self.db.commit()
             return reset_token
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Error creating reset token: {e}") from e
 
     def get_valid_token(self, token: str) -> Optional[PasswordResetToken]:
         """Get a valid (not expired and not used) reset token"""
-        query = text("""
-            SELECT * FROM password_reset_tokens 
+        query = text(f"""
+            SELECT {RESET_TOKEN_COLUMNS} FROM password_reset_tokens 
             WHERE token = :token AND is_used = false AND expires_at > :now
         """)
         result = self.db.execute(query, {
             "token": token,
             "now": datetime.now(timezone.utc)
-        }).fetchone()
+        }).first()
         return self._row_to_model(result) if result else None
 
     def mark_token_as_used(self, token: str) -> bool:
@@ -62,7 +63,6 @@ class PasswordResetRepository:
         """)
         
         result = self.db.execute(query, {"token": token})
-        self.db.commit()
         return result.rowcount > 0
 
     def cleanup_expired_tokens(self) -> int:
@@ -72,15 +72,15 @@ class PasswordResetRepository:
             WHERE expires_at < :now
         """)
         result = self.db.execute(query, {"now": datetime.now(timezone.utc)})
-        self.db.commit()
         return result.rowcount
 
     def _row_to_model(self, row) -> PasswordResetToken:
+        (id_, email, token, expires_at, is_used, created_at) = row
         return PasswordResetToken(
-            id=str(row.id),
-            email=row.email,
-            token=row.token,
-            expiresAt=row.expires_at,
-            isUsed=row.is_used,
-            createdAt=row.created_at,
-        )
+            id=str(id_),
+            email=email,
+            token=token,
+            expiresAt=expires_at,
+            isUsed=is_used,
+            createdAt=created_at,
+        )
\ No newline at end of file
@@ -4,9 +4,14 @@ from sqlalchemy import text, insert, select, update, delete
 from sqlalchemy.exc import IntegrityError
 import json
 
-from models import PaymentResponse, RefundResponse
+from models import PaymentMethod, PaymentResponse, RefundResponse
 
 
+# Order must match the positional unpack in _row_to_model
+PAYMENT_COLUMNS = "id, booking_id, status, transaction_id, amount, currency, payment_method, failure_reason, created_at, updated_at"
+# Order must match the positional unpack in _row_to_refund_model
+REFUND_COLUMNS = "id, payment_id, status, amount, reason, created_at"
+
 class PaymentsRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -14,12 +19,12 @@ class PaymentsRepository:
     def create_payment(self, payment: PaymentResponse) -> PaymentResponse:
         """Create a new payment record"""
         try:
-            query = text("""
+            query = text(f"""
                 INSERT INTO payments (id, booking_id, status, transaction_id, amount, currency, 
                                     payment_method, failure_reason, created_at, updated_at)
                 VALUES (:id, :booking_id, :status, :transaction_id, :amount, :currency, 
                         :payment_method, :failure_reason, :created_at, :updated_at)
-                RETURNING *
+                RETURNING {PAYMENT_COLUMNS}
             """)
 
             result = self.db.execute(query, {
@@ -33,23 +38,27 @@ class PaymentsRepository:
                 "failure_reason": payment.failureReason,
                 "created_at": payment.createdAt,
                 "updated_at": payment.updatedAt
-            }).fetchone()
-            self.db.commit()
+            }).first()
             return self._row_to_model(result) if result else payment
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Payment creation failed: {str(e)}") from e
 
+    def create_payment_and_commit(self, payment: PaymentResponse) -> PaymentResponse:
+        """Create a payment record and commit it immediately (for scripts outside a service transaction)"""
+        created = self.create_payment(payment)
+        self.db.commit()
+        return created
+
     def get_payment(self, payment_id: str) -> Optional[PaymentResponse]:
         """Get payment by ID"""
-        query = select(text("*")).select_from(text("payments")).where(text("id = :payment_id"))
-        result = self.db.execute(query, {"payment_id": payment_id}).fetchone()
+        query = select(text(PAYMENT_COLUMNS)).select_from(text("payments")).where(text("id = :payment_id"))
+        result = self.db.execute(query, {"payment_id": payment_id}).first()
         return self._row_to_model(result) if result else None
 
     def get_payment_by_booking(self, booking_id: str) -> Optional[PaymentResponse]:
         """Get payment by booking ID"""
-        query = select(text("*")).select_from(text("payments")).where(text("booking_id = :booking_id"))
-        result = self.db.execute(query, {"booking_id": booking_id}).fetchone()
+        query = select(text(PAYMENT_COLUMNS)).select_from(text("payments")).where(text("booking_id = :booking_id"))
+        result = self.db.execute(query, {"booking_id": booking_id}).first()
         return self._row_to_model(result) if result else None
 
     def update_payment_status(self, payment_id: str, status: str, failure_reason: Optional[str] = None) -> bool:
@@ -57,21 +66,17 @@ class PaymentsRepository:
         try:
             query = text("""
                 UPDATE payments 
-                SET status = :status, failure_reason = :failure_reason, updated_at = :updated_at
+                SET status = :status, failure_reason = :failure_reason, updated_at = NOW()
                 WHERE id = :payment_id
             """)
 
-            from datetime import datetime, timezone
             result = self.db.execute(query, {
                 "payment_id": payment_id,
                 "status": status,
-                "failure_reason": failure_reason,
-                "updated_at": datetime.now(timezone.utc)
+                "failure_reason": failure_reason
             })
-            self.db.commit()
             return result.rowcount > 0
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Payment update failed: {str(e)}") from e
 
     def create_refund(self, refund: RefundResponse) -> RefundResponse:
@@ -90,45 +95,73 @@ class PaymentsRepository:
                 "reason": refund.reason,
                 "created_at": refund.createdAt
             })
-            self.db.commit()
             return refund
         except IntegrityError as e:
-            self.db.rollback()
+            raise ValueError(f"Refund creation failed: {str(e)}") from e
+
+    def refund_and_mark(self, refund: RefundResponse) -> Optional[RefundResponse]:
+        """Mark a completed payment refunded and insert its refund row in one statement.
+
+        Returns None (and writes nothing) when the payment is missing or no longer completed.
+        """
+        try:
+            query = text(f"""
+                WITH marked AS (
+                    UPDATE payments
+                    SET status = 'refunded', failure_reason = NULL, updated_at = NOW()
+                    WHERE id = :payment_id AND status = 'completed'
+                    RETURNING id
+                )
+                INSERT INTO refunds (id, payment_id, status, amount, reason, created_at)
+                SELECT :id, marked.id, :status, :amount, :reason, :created_at FROM marked
+                RETURNING {REFUND_COLUMNS}
+            """)
+
+            result = self.db.execute(query, {
+                "id": refund.id,
+                "payment_id": refund.paymentId,
+                "status": refund.status,
+                "amount": refund.amount,
+                "reason": refund.reason,
+                "created_at": refund.createdAt
+            }).first()
+            return self._row_to_refund_model(result) if result else None
+        except IntegrityError as e:
             raise ValueError(f"Refund creation failed: {str(e)}") from e
 
     def get_refunds_by_payment(self, payment_id: str) -> List[RefundResponse]:
         """Get all refunds for a payment"""
-        query = select(text("*")).select_from(text("refunds")).where(text("payment_id = :payment_id"))
+        query = select(text(REFUND_COLUMNS)).select_from(text("refunds")).where(text("payment_id = :payment_id"))
         result = self.db.execute(query, {"payment_id": payment_id})
         return [self._row_to_refund_model(row) for row in result]
 
     def _row_to_model(self, row) -> PaymentResponse:
-        from models import PaymentMethod
+        (id_, booking_id, status, transaction_id, amount, currency,
+         payment_method, failure_reason, created_at, updated_at) = row
         # Handle both string and dict payment_method
-        if isinstance(row.payment_method, str):
-            payment_method_data = json.loads(row.payment_method)
-        else:
-            payment_method_data = row.payment_method
+        if isinstance(payment_method, str):
+            payment_method = json.loads(payment_method)
             
         return PaymentResponse(
-            id=str(row.id),
-            bookingId=str(row.booking_id),
-            status=row.status,
-            transactionId=row.transaction_id,
-            amount=float(row.amount),
-            currency=row.currency,
-            paymentMethod=PaymentMethod(**payment_method_data),
-            failureReason=row.failure_reason,
-            createdAt=row.created_at,
-            updatedAt=row.updated_at
+            id=str(id_),
+            bookingId=str(booking_id),
+            status=status,
+            transactionId=transaction_id,
+            amount=float(amount),
+            currency=currency,
+            paymentMethod=PaymentMethod(**payment_method),
+            failureReason=failure_reason,
+            createdAt=created_at,
+            updatedAt=updated_at
         )
 
     def _row_to_refund_model(self, row) -> RefundResponse:
+        (id_, payment_id, status, amount, reason, created_at) = row
         return RefundResponse(
-            id=str(row.id),
-            paymentId=str(row.payment_id),
-            status=row.status,
-            amount=float(row.amount),
-            reason=row.reason,
-            createdAt=row.created_at
-        )
+            id=str(id_),
+            paymentId=str(payment_id),
+            status=status,
+            amount=float(amount),
+            reason=reason,
+            createdAt=created_at
+        )
\ No newline at end of file
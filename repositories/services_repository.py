@@ -1,99 +1,162 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import text, insert, select, update, delete
+from sqlalchemy import text, insert, select, update, delete, bindparam
 from sqlalchemy.exc import IntegrityError
 import json
+from functools import lru_cache
 
 from models import Service, ServiceAvailability
 
+# Order must match the positional unpack in _row_to_model
+SERVICE_COLUMNS = "id, provider_id, name, description, price, duration_minutes, availability, status, created_at, updated_at"
+
+# Restricts a statement to services owned by the provider with :provider_email
+OWNED_BY_PROVIDER = "provider_id = (SELECT id FROM users WHERE email = :provider_email)"
+
+INSERT_SERVICE = text("""
+    INSERT INTO services (id, provider_id, name, description, price, duration_minutes, availability, status, created_at, updated_at)
+    VALUES (:id, :provider_id, :name, :description, :price, :duration_minutes, :availability, :status, :created_at, :updated_at)
+""")
+
+DELETE_SERVICES_OWNED_BY = text(
+    f"DELETE FROM services WHERE id IN :service_ids AND {OWNED_BY_PROVIDER} RETURNING id"
+).bindparams(bindparam("service_ids", expanding=True))
+
+# Columns a caller may pass to update_service; anything else is rejected
+UPDATABLE_COLUMNS = frozenset({
+    "name", "description", "price", "duration_minutes", "availability", "status",
+})
+
+
+@lru_cache(maxsize=128)
+def _update_query(columns: tuple):
+    """Build (once per column set) the UPDATE statement for a partial service update"""
+    # updated_at is stamped by the database so the caller never has to send it
+    set_clause = ", ".join([f"{column} = :{column}" for column in columns] + ["updated_at = NOW()"])
+    return text(f"UPDATE services SET {set_clause} WHERE id = :service_id RETURNING {SERVICE_COLUMNS}")
+
 
 class ServicesRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def list_services(self) -> List[Service]:
-        query = select(text("*")).select_from(text("services"))
+        query = select(text(SERVICE_COLUMNS)).select_from(text("services"))
         result = self.db.execute(query)
         return [self._row_to_model(row) for row in result]
 
     def get_service(self, service_id: str) -> Optional[Service]:
-        query = select(text("*")).select_from(text("services")).where(text("id = :service_id"))
-        result = self.db.execute(query, {"service_id": service_id}).fetchone()
+        query = select(text(SERVICE_COLUMNS)).select_from(text("services")).where(text("id = :service_id"))
+        result = self.db.execute(query, {"service_id": service_id}).first()
+        return self._row_to_model(result) if result else None
+
+    def get_service_owned_by(self, service_id: str, provider_email: str) -> Optional[Service]:
+        """Fetch a service only if it belongs to the given provider, in one query"""
+        query = (
+            select(text(SERVICE_COLUMNS))
+            .select_from(text("services"))
+            .where(text("id = :service_id"))
+            .where(text(OWNED_BY_PROVIDER))
+        )
+        result = self.db.execute(query, {
+            "service_id": service_id,
+            "provider_email": provider_email.lower().strip()
+        }).first()
         return self._row_to_model(result) if result else None
 
     def create_service(self, service: Service) -> Service:
         try:
-            query = text("""
-                INSERT INTO services (id, provider_id, name, description, price, duration_minutes, availability, status, created_at, updated_at)
-                VALUES (:id, :provider_id, :name, :description, :price, :duration_minutes, :availability, :status, :created_at, :updated_at)
-            """)
-            
-            self.db.execute(query, {
-                "id": service.id,
-                "provider_id": service.providerId,
-                "name": service.name,
-                "description": service.description,
-                "price": service.price,
-                "duration_minutes": service.durationMinutes,
-                "availability": service.availability.model_dump_json(),
-                "status": service.status,
-                "created_at": service.createdAt,
-                "updated_at": service.updatedAt
-            })
-            self.db.commit()
+            self.db.execute(INSERT_SERVICE, self._to_params(service))
             return service
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Service creation failed: {str(e)}") from e
 
-    def update_service(self, service_id: str, updated: Service) -> Optional[Service]:
+    def create_services_batch(self, services: List[Service]) -> List[Service]:
+        """Insert many services with one executemany call; psycopg sends the per-row INSERTs pipelined, not one round trip each"""
+        if not services:
+            return []
         try:
-            query = text("""
-                UPDATE services 
-                SET provider_id = :provider_id, name = :name, description = :description, 
-                    price = :price, duration_minutes = :duration_minutes, 
-                    availability = :availability, status = :status, updated_at = :updated_at
-                    
-                WHERE id = :service_id
-            """)
-            
-            result = self.db.execute(query, {
-                "service_id": service_id,
-                "provider_id": updated.providerId,
-                "name": updated.name,
-                "description": updated.description,
-                "price": updated.price,
-                "duration_minutes": updated.durationMinutes,
-                "availability": updated.availability.model_dump_json(),
-                "status": updated.status,
-                "updated_at": updated.updatedAt
-            })
-            self.db.commit()
-            return updated if result.rowcount > 0 else None
+            self.db.execute(INSERT_SERVICE, [self._to_params(s) for s in services])
+            return services
+        except IntegrityError as e:
+            raise ValueError(f"Service creation failed: {str(e)}") from e
+
+    def update_service(self, service_id: str, changes: dict) -> Optional[Service]:
+        """Update only the columns present in ``changes`` (keyed by column name)"""
+        unknown = set(changes) - UPDATABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Cannot update service columns: {', '.join(sorted(unknown))}")
+        if not changes:
+            return self.get_service(service_id)
+
+        params = dict(changes)
+        if params.get("availability") is not None:
+            # Same JSON encoding as create, whether given a ServiceAvailability or a plain dict
+            params["availability"] = ServiceAvailability.model_validate(params["availability"]).model_dump_json()
+        params["service_id"] = service_id
+
+        try:
+            query = _update_query(tuple(sorted(changes)))
+            result = self.db.execute(query, params).first()
+            return self._row_to_model(result) if result else None
         except IntegrityError as e:
-            self.db.rollback()
             raise ValueError(f"Service update failed: {str(e)}") from e
 
     def delete_service(self, service_id: str) -> bool:
         query = text("DELETE FROM services WHERE id = :service_id")
         result = self.db.execute(query, {"service_id": service_id})
-        self.db.commit()
         return result.rowcount > 0
 
+    def delete_service_owned_by(self, service_id: str, provider_email: str) -> bool:
+        """Delete a service only if it belongs to the given provider, in one statement"""
+        query = text(f"DELETE FROM services WHERE id = :service_id AND {OWNED_BY_PROVIDER}")
+        result = self.db.execute(query, {
+            "service_id": service_id,
+            "provider_email": provider_email.lower().strip()
+        })
+        return result.rowcount > 0
+
+    def delete_services_owned_by(self, service_ids: List[str], provider_email: str) -> List[str]:
+        """Delete every listed service the provider owns in one statement; returns the deleted ids"""
+        if not service_ids:
+            return []
+        result = self.db.execute(DELETE_SERVICES_OWNED_BY, {
+            "service_ids": list(service_ids),
+            "provider_email": provider_email.lower().strip()
+        })
+        return [str(row[0]) for row in result]
+
+    def _to_params(self, service: Service) -> dict:
+        return {
+            "id": service.id,
+            "provider_id": service.providerId,
+            "name": service.name,
+            "description": service.description,
+            "price": service.price,
+            "duration_minutes": service.durationMinutes,
+            "availability": service.availability.model_dump_json(),
+            "status": service.status,
+            "created_at": service.createdAt,
+            "updated_at": service.updatedAt
+        }
+
     def _row_to_model(self, row) -> Service:
-        # Parse availability JSON
-        availability_data = row.availability if hasattr(row, 'availability') and row.availability else {}
-        availability = ServiceAvailability(**availability_data)
+        (id_, provider_id, name, description, price, duration_minutes,
+         availability_data, status, created_at, updated_at) = row
+        # availability is JSONB (dict) in Postgres but may arrive as TEXT (str)
+        if isinstance(availability_data, str):
+            availability_data = json.loads(availability_data)
+        availability = ServiceAvailability(**(availability_data or {}))
         
         return Service(
-            id=str(row.id),
-            providerId=str(row.provider_id),
-            name=row.name,
-            description=row.description,
-            price=float(row.price),
-            durationMinutes=row.duration_minutes,
+            id=str(id_),
+            providerId=str(provider_id),
+            name=name,
+            description=description,
+            price=float(price),
+            durationMinutes=duration_minutes,
             availability=availability,
-            status=row.status,
-            createdAt=row.created_at,
-            updatedAt=row.updated_at
+            status=status,
+            createdAt=created_at,
+            updatedAt=updated_at
         )
\ No newline at end of file
@@ -1,12 +1,22 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import text, insert, select, update, delete
+from sqlalchemy import text, insert, select, update, delete, bindparam
 from sqlalchemy.exc import IntegrityError
+import json
 
-from models import User, UserRole
+from models import User, UserRole, UserProfile, UserCredentials
 from logging_config import get_logger, log_database_operation
 
 
+# Order must match the positional unpack in _row_to_model
+USER_COLUMNS = "id, email, password, role, profile, created_at, updated_at"
+CREDENTIAL_COLUMNS = "id, email, password, role"
+
+# Built once at import so SQLAlchemy's compiled-statement cache is hit on every reset
+UPDATE_PASSWORD_BY_EMAIL = text(
+    "UPDATE users SET password = :password, updated_at = NOW() WHERE email = :email"
+)
+
 class UsersRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -15,7 +25,7 @@ class UsersRepository:
     def list_users(self, role: Optional[UserRole] = None) -> List[User]:
         self.logger.info("Querying users from database", role_filter=role)
         # Using SQLAlchemy Core for type safety and SQL injection prevention
-        query = select(text("*")).select_from(text("users"))
+        query = select(text(USER_COLUMNS)).select_from(text("users"))
         if role is not None:
             query = query.where(text("role = :role"))
             result = self.db.execute(query, {"role": role.value})
@@ -34,8 +44,8 @@ class UsersRepository:
             raise ValueError("user_id must be a non-empty string")
         
         # Parameterized query - safe from SQL injection
-        query = select(text("*")).select_from(text("users")).where(text("id = :user_id"))
-        result = self.db.execute(query, {"user_id": user_id}).fetchone()
+        query = select(text(USER_COLUMNS)).select_from(text("users")).where(text("id = :user_id"))
+        result = self.db.execute(query, {"user_id": user_id}).first()
         
         if result:
             self.logger.info("User found in database", user_id=user_id, email=result.email)
@@ -44,6 +54,21 @@ class UsersRepository:
             self.logger.info("User not found", user_id=user_id)
             return None
 
+    def get_by_ids(self, user_ids: List[str]) -> Dict[str, User]:
+        """Fetch several users in one query, keyed by id"""
+        if not user_ids:
+            return {}
+        
+        query = (
+            select(text(USER_COLUMNS))
+            .select_from(text("users"))
+            .where(text("id IN :user_ids").bindparams(bindparam("user_ids", expanding=True)))
+        )
+        result = self.db.execute(query, {"user_ids": list(set(user_ids))})
+        users = {user.id: user for user in map(self._row_to_model, result)}
+        self.logger.info("Users retrieved by ids", requested=len(user_ids), found=len(users))
+        return users
+
     def get_by_email(self, email: str) -> Optional[User]:
         self.logger.info("Querying user by email", email=email)
         # Input validation
@@ -52,8 +77,8 @@ class UsersRepository:
             raise ValueError("Email must be a non-empty string")
         
         # Parameterized query - safe from SQL injection
-        query = select(text("*")).select_from(text("users")).where(text("email = :email"))
-        result = self.db.execute(query, {"email": email.lower().strip()}).fetchone()
+        query = select(text(USER_COLUMNS)).select_from(text("users")).where(text("email = :email"))
+        result = self.db.execute(query, {"email": email.lower().strip()}).first()
         
         if result:
             user = self._row_to_model(result)
@@ -63,6 +88,19 @@ class UsersRepository:
             self.logger.warning("User not found in database", email=email)
             return None
 
+    def get_by_email_for_auth(self, email: str) -> Optional[UserCredentials]:
+        """Fetch only what a password check needs, skipping the profile JSON"""
+        if not email or not isinstance(email, str):
+            self.logger.error("Invalid email provided", email=email)
+            raise ValueError("Email must be a non-empty string")
+        
+        query = select(text(CREDENTIAL_COLUMNS)).select_from(text("users")).where(text("email = :email"))
+        result = self.db.execute(query, {"email": email.lower().strip()}).first()
+        if not result:
+            return None
+        id_, email, password, role = result
+        return UserCredentials(id=str(id_), email=email, password=password, role=UserRole(role))
+
     def create_user(self, user: User) -> User:
         self.logger.info("Creating user in database", user_id=user.id, email=user.email, role=user.role)
         try:
@@ -76,7 +114,6 @@ class UsersRepository:
             if hasattr(user.profile, 'model_dump_json'):
                 profile_json = user.profile.model_dump_json()
             else:
-                import json
                 profile_json = json.dumps(user.profile)
             
             self.db.execute(query, {
@@ -88,32 +125,33 @@ class UsersRepository:
                 "created_at": user.createdAt,
                 "updated_at": user.updatedAt
             })
-            self.db.commit()
             self.logger.info("User created successfully in database", user_id=user.id, email=user.email)
             return user
         except IntegrityError as e:
-            self.db.rollback()
             self.logger.error("User creation failed - integrity error", user_id=user.id, email=user.email, error=str(e))
             raise ValueError(f"User with email {user.email} already exists") from e
 
+    def update_password_by_email(self, email: str, hashed_password: str) -> bool:
+        """Store a new password hash for the user with this email"""
+        result = self.db.execute(UPDATE_PASSWORD_BY_EMAIL, {
+            "email": email.lower().strip(),
+            "password": hashed_password
+        })
+        self.logger.info("User password updated", email=email, updated=result.rowcount > 0)
+        return result.rowcount > 0
+
     def _row_to_model(self, row) -> User:
-        from models import UserProfile
-        import json
-        
+        (id_, email, password, role, profile, created_at, updated_at) = row
         # Handle profile deserialization properly
-        if isinstance(row.profile, str):
-            profile_data = json.loads(row.profile)
-        else:
-            profile_data = row.profile
+        if isinstance(profile, str):
+            profile = json.loads(profile)
         
         return User(
-            id=str(row.id),
-            email=row.email,
-            password=row.password,
-            role=UserRole(row.role),
-            profile=UserProfile(**profile_data),
-            createdAt=row.created_at,
-            updatedAt=row.updated_at,
-        )
-
-
+            id=str(id_),
+            email=email,
+            password=password,
+            role=UserRole(role),
+            profile=UserProfile(**profile),
+            createdAt=created_at,
+            updatedAt=updated_at,
+        )
\ No newline at end of file
@@ -1,5 +1,7 @@
 from typing import List, Optional
 from datetime import timedelta
+import threading
+from cachetools import TTLCache
 
 from models import (
     Booking,
@@ -10,6 +12,7 @@ from models import (
     PaymentRequest,
     PaymentResponse,
     NotificationType,
+    User,
 )
 from repositories.bookings_repository import BookingsRepository
 from repositories.services_repository import ServicesRepository
@@ -19,6 +22,22 @@ from services.payments_service import PaymentsService
 from repositories.payments_repository import PaymentsRepository
 from services.notifications_service import NotificationsService
 from repositories.notifications_repository import NotificationsRepository
+from database import savepoint, transaction
+from logging_config import get_logger
+
+
+logger = get_logger("bookings_service")
+
+# booking_id -> Booking for GET /bookings/{id}, shared by every request in the worker.
+# Writes made through this service evict their entry; the TTL bounds staleness for
+# writes made by other workers.
+_booking_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_booking_cache_lock = threading.Lock()
+
+
+def _evict_booking(booking_id: str) -> None:
+    with _booking_cache_lock:
+        _booking_cache.pop(booking_id, None)
 
 
 class BookingsService:
@@ -33,30 +52,38 @@ class BookingsService:
     def list_bookings(self, customer_id: Optional[str] = None, provider_id: Optional[str] = None) -> List[BookingResponse]:
         return [self._to_response(b) for b in self.bookings_repo.list_bookings(customer_id, provider_id)]
 
+    def list_bookings_for_user(self, user: User, customer_id: Optional[str] = None,
+                               provider_id: Optional[str] = None) -> List[BookingResponse]:
+        """Bookings the user takes part in (as customer or provider), optionally filtered; authorized by the query itself"""
+        rows = self.bookings_repo.list_bookings_for_participant(user.id, customer_id, provider_id)
+        return [self._to_response(b) for b in rows]
+
     def get_booking(self, booking_id: str) -> Optional[BookingResponse]:
-        b = self.bookings_repo.get_booking(booking_id)
+        with _booking_cache_lock:
+            b = _booking_cache.get(booking_id)
+        if b is None:
+            b = self.bookings_repo.get_booking(booking_id)
+            if b:
+                with _booking_cache_lock:
+                    _booking_cache[booking_id] = b
         return self._to_response(b) if b else None
 
-    def create_booking(self, customer_id: str, payload: BookingCreateRequest) -> Optional[BookingResponse]:
+    def create_booking(self, customer: User, payload: BookingCreateRequest) -> Optional[BookingResponse]:
         """Create a booking with mandatory payment processing - payment must succeed before booking is created"""
         service = self.services_repo.get_service(payload.serviceId)
         if not service:
             return None
         
-        # Get customer and provider details for email notifications
-        customer = self.users_repo.get_by_email(customer_id)  # customer_id is email
-        
-        # provider.id is UUID, need to get provider by ID
+        # Get provider details for email notifications (customer is already resolved by auth)
         provider_user = self.users_repo.get_by_id(service.providerId)  # providerId is UUID
         
-        if not customer or not provider_user:
+        if not provider_user:
             return None
         
         # Create booking object with PENDING status and save it first
         # (needed because payment has foreign key to bookings)
-        customer_uuid = customer.id
         booking = Booking(
-            customerId=customer_uuid,
+            customerId=customer.id,
             serviceId=payload.serviceId,
             providerId=service.providerId,
             status=BookingStatus.PENDING,  # Start as pending until payment succeeds
@@ -66,66 +93,44 @@ class BookingsService:
             notes=payload.notes,
         )
         
-        # Save booking FIRST (payment table has FK to bookings)
-        created = self.bookings_repo.create_booking(booking)
-        
-        # Create a new PaymentRequest with the actual booking ID
-        from models import PaymentRequest
-        payment_req = PaymentRequest(
-            bookingId=created.id,
-            amount=payload.payment.amount,
-            currency=payload.payment.currency,
-            paymentMethod=payload.payment.paymentMethod
-        )
-        
-        # Process payment - MANDATORY for all bookings
-        payments_service = PaymentsService(PaymentsRepository(self.bookings_repo.db))
-        payment = payments_service.process_payment(payment_req)
+        with transaction(self.bookings_repo.db):
+            # Savepoint so a failed payment discards the booking and payment rows together,
+            # along with the payment notification queued for after commit
+            with savepoint(self.bookings_repo.db) as attempt:
+                # Save booking FIRST (payment table has FK to bookings)
+                created = self.bookings_repo.create_booking(booking)
+        
+                # Create a new PaymentRequest with the actual booking ID
+                payment_req = PaymentRequest(
+                    bookingId=created.id,
+                    amount=payload.payment.amount,
+                    currency=payload.payment.currency,
+                    paymentMethod=payload.payment.paymentMethod
+                )
+        
+                # Process payment - MANDATORY for all bookings
+                payment = self.payments_service.process_payment(payment_req)
 
-        # If payment fails, delete the booking and process refund
-        if payment.status == "failed":
-            # Delete the booking since payment failed
-            self.bookings_repo.delete_booking(created.id)
-            # Process refund for failed payment
-            payments_service.process_refund(payment.id, "Payment failed - automatic refund")
-            return None
+                # If payment fails, roll the booking back (nothing was charged, so no refund)
+                if payment.status == "failed":
+                    attempt.rollback()
+                    return None
 
-        # Payment succeeded, update booking status to CONFIRMED
-        from models import Booking as BookingModel
-        updated_booking = BookingModel(
-            id=created.id,
-            customerId=created.customerId,
-            serviceId=created.serviceId,
-            providerId=created.providerId,
-            status=BookingStatus.CONFIRMED,
-            scheduledAt=created.scheduledAt,
-            duration=created.duration,
-            totalAmount=created.totalAmount,
-            notes=created.notes,
-            createdAt=created.createdAt,
-            updatedAt=created.updatedAt
-        )
-        created = self.bookings_repo.update_booking(created.id, updated_booking)
-        
-        # Send email notifications
-        try:
-            self.email_service.send_booking_confirmation(customer, provider_user, service, created)
-            self.email_service.send_booking_notification_to_provider(customer, provider_user, service, created)
-        except Exception as e:
-            # Log error but don't fail the booking creation
-            print(f"Email notification failed: {e}")
+            # Payment succeeded, flip the booking to CONFIRMED in a single UPDATE
+            created = self.bookings_repo.set_status(created.id, BookingStatus.CONFIRMED)
         
-        # Send real-time notifications
+        # Booking and payment are committed; notifications run in their own transactions
+        # so a failure here can't take the booking down with it
         try:
             # Notify customer
             self.notifications_service.create_booking_notification(
-                user_id=customer_id,
+                user_id=customer.email,
                 booking_id=created.id,
                 notification_type=NotificationType.BOOKING_CREATED,
                 service_title=service.name,
                 scheduled_at=created.scheduledAt.isoformat() if created.scheduledAt else None
             )
-            
+        
             # Notify provider
             self.notifications_service.create_booking_notification(
                 user_id=service.providerId,
@@ -136,21 +141,21 @@ class BookingsService:
             )
         except Exception as e:
             # Log error but don't fail the booking creation
-            print(f"Real-time notification failed: {e}")
+            logger.warning("Real-time notification failed", booking_id=created.id, error=str(e))
+        
+        # Send email notifications off the request path
+        self.email_service.send_in_background(
+            self.email_service.send_booking_pair, customer, provider_user, service, created
+        )
         
         return self._to_response(created)
 
-    def update_booking(self, booking_id: str, payload: BookingUpdateRequest, current_user_email: str) -> Optional[BookingResponse]:
+    def update_booking(self, booking_id: str, payload: BookingUpdateRequest, current_user: User) -> Optional[BookingResponse]:
         """Update a booking with authorization check - only customer or provider can update"""
         existing = self.bookings_repo.get_booking(booking_id)
         if not existing:
             return None
         
-        # Get current user's UUID from email
-        current_user = self.users_repo.get_by_email(current_user_email)
-        if not current_user:
-            return None
-        
         # Authorization check: only customer or provider can update (compare UUIDs)
         if existing.customerId != current_user.id and existing.providerId != current_user.id:
             return None  # Service layer returns None for unauthorized access
@@ -168,72 +173,68 @@ class BookingsService:
             notes=payload.notes if payload.notes is not None else existing.notes,
             createdAt=existing.createdAt,
         )
-        saved = self.bookings_repo.update_booking(booking_id, updated)
-        
-        if saved:
-            # Send email notification if status changed
-            if payload.status and payload.status != old_status:
-                try:
-                    # Get user details for email (customerId and providerId are UUIDs)
-                    customer = self.users_repo.get_by_id(existing.customerId)
-                    provider = self.users_repo.get_by_id(existing.providerId)
-                    service = self.services_repo.get_service(existing.serviceId)
-                    
-                    if customer and provider and service:
-                        if payload.status == BookingStatus.CANCELLED:
-                            self.email_service.send_booking_cancellation(customer, provider, service, saved)
-                        else:
-                            self.email_service.send_booking_update(customer, provider, service, saved, old_status)
-                except Exception as e:
-                    print(f"Email notification failed: {e}")
-            
-            # Send real-time notifications if status changed
-            if payload.status and payload.status != old_status:
-                try:
-                    service = self.services_repo.get_service(existing.serviceId)
-                    if service:
-                        # Notify customer
-                        self.notifications_service.create_booking_notification(
-                            user_id=existing.customerId,
-                            booking_id=booking_id,
-                            notification_type=NotificationType.BOOKING_UPDATED,
-                            service_title=service.name,
-                            scheduled_at=saved.scheduledAt.isoformat() if saved.scheduledAt else None
-                        )
-                        
-                        # Notify provider
-                        self.notifications_service.create_booking_notification(
-                            user_id=existing.providerId,
-                            booking_id=booking_id,
-                            notification_type=NotificationType.BOOKING_UPDATED,
-                            service_title=service.name,
-                            scheduled_at=saved.scheduledAt.isoformat() if saved.scheduledAt else None
-                        )
-                except Exception as e:
-                    print(f"Real-time notification failed: {e}")
+        with transaction(self.bookings_repo.db):
+            saved = self.bookings_repo.update_booking(booking_id, updated)
+        
+        # Evict after commit so a concurrent read can't re-cache the old row
+        _evict_booking(booking_id)
+        
+        # Email and real-time notifications only go out once the change is committed,
+        # and only when the status changed
+        if saved and payload.status and payload.status != old_status:
+            # One lookup for both parties and one for the service, shared by both notification paths
+            users = self.users_repo.get_by_ids([existing.customerId, existing.providerId])
+            customer = users.get(existing.customerId)
+            provider = users.get(existing.providerId)
+            service = self.services_repo.get_service(existing.serviceId)
+
+            if customer and provider and service:
+                if payload.status == BookingStatus.CANCELLED:
+                    self.email_service.send_in_background(
+                        self.email_service.send_booking_cancellation, customer, provider, service, saved
+                    )
+                else:
+                    self.email_service.send_in_background(
+                        self.email_service.send_booking_update, customer, provider, service, saved, old_status
+                    )
+        
+            try:
+                if service:
+                    # Notify customer
+                    self.notifications_service.create_booking_notification(
+                        user_id=existing.customerId,
+                        booking_id=booking_id,
+                        notification_type=NotificationType.BOOKING_UPDATED,
+                        service_title=service.name,
+                        scheduled_at=saved.scheduledAt.isoformat() if saved.scheduledAt else None
+                    )
+                
+                    # Notify provider
+                    self.notifications_service.create_booking_notification(
+                        user_id=existing.providerId,
+                        booking_id=booking_id,
+                        notification_type=NotificationType.BOOKING_UPDATED,
+                        service_title=service.name,
+                        scheduled_at=saved.scheduledAt.isoformat() if saved.scheduledAt else None
+                    )
+            except Exception as e:
+                logger.warning("Real-time notification failed", booking_id=booking_id, error=str(e))
         
         return self._to_response(saved) if saved else None
 
-    def delete_booking(self, booking_id: str, current_user_email: str) -> bool:
+    def delete_booking(self, booking_id: str, current_user: User) -> bool:
         """Delete a booking with authorization check - only customer or provider can delete"""
-        existing = self.bookings_repo.get_booking(booking_id)
-        if not existing:
-            return False
-        
-        # Get current user's UUID from email
-        current_user = self.users_repo.get_by_email(current_user_email)
-        if not current_user:
-            return False
-        
-        # Authorization check: only customer or provider can delete (compare UUIDs)
-        if existing.customerId != current_user.id and existing.providerId != current_user.id:
-            return False  # Service layer returns False for unauthorized access
-        
-        return self.bookings_repo.delete_booking(booking_id)
+        # Authorization check: only customer or provider can delete (compare UUIDs).
+        # The check runs inside the DELETE, so missing and not-allowed both return False.
+        with transaction(self.bookings_repo.db):
+            deleted = self.bookings_repo.delete_booking_for_participant(booking_id, current_user.id)
+        if deleted:
+            _evict_booking(booking_id)
+        return deleted
 
 
     def _to_response(self, b: Booking) -> BookingResponse:
-        return BookingResponse(
+        return BookingResponse.model_construct(
             id=b.id,
             customerId=b.customerId,
             serviceId=b.serviceId,
@@ -0,0 +1,65 @@
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+
+class BroadcastChannel:
+    """Per-user fan-out buffer: each message is stored once and every reader tracks its own position"""
+
+    def __init__(self, maxlen: int = 128):
+        self.buffer: deque = deque(maxlen=maxlen)
+        self.next_seq = 0
+        self.readers = 0
+        # Set once per publish, then replaced, so readers need no lock to wait on it
+        self._published = asyncio.Event()
+
+    def publish_nowait(self, message) -> None:
+        """Append a message and wake every waiting reader; must run on the event loop thread"""
+        self.buffer.append(message)
+        self.next_seq += 1
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    async def publish(self, message) -> None:
+        """Coroutine form of publish_nowait, for callers scheduling it on the loop"""
+        self.publish_nowait(message)
+
+    async def read(self, seq: int, timeout: float) -> Tuple[int, List]:
+        """Wait for messages after `seq`; return the new position and the messages still buffered"""
+        if seq >= self.next_seq:
+            await asyncio.wait_for(self._published.wait(), timeout)
+        head = self.next_seq - len(self.buffer)
+        # A reader that fell more than maxlen behind skips what was already evicted
+        start = max(seq, head) - head
+        return self.next_seq, list(islice(self.buffer, start, None))
+
+
+# user_id -> channel, shared by every service in the process
+_CHANNELS: Dict[str, BroadcastChannel] = {}
+
+
+def subscribe(user_id: str) -> BroadcastChannel:
+    """Register a reader for a user's channel, creating the channel on first use"""
+    channel = _CHANNELS.get(user_id)
+    if channel is None:
+        channel = _CHANNELS[user_id] = BroadcastChannel()
+    channel.readers += 1
+    return channel
+
+
+def unsubscribe(user_id: str) -> None:
+    """Drop a reader; the channel goes away with its last reader"""
+    channel = _CHANNELS.get(user_id)
+    if channel is not None:
+        channel.readers -= 1
+        if channel.readers <= 0:
+            _CHANNELS.pop(user_id, None)
+
+
+def get_channel(user_id: str) -> Optional[BroadcastChannel]:
+    return _CHANNELS.get(user_id)
+
+
+def all_channels() -> Dict[str, BroadcastChannel]:
+    return _CHANNELS
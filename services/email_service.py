@@ -1,10 +1,121 @@
-from typing import Optional
+from typing import Callable, Optional
 from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
-import json
+import atexit
+import itertools
+import mmap
+import threading
 from pathlib import Path
 
+import orjson
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, select_autoescape
+
 from models import User, Service, Booking, BookingStatus
+from logging_config import get_logger
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "emails"
+
+_TEMPLATE_NAMES = (
+    "booking_confirmation",
+    "booking_notification_provider",
+    "booking_update",
+    "booking_cancellation",
+    "password_reset",
+    "password_reset_confirmation",
+)
+
+# Compiled once per output directory; EmailService itself is created per request
+_template_sets: dict[str, dict] = {}
+_template_lock = threading.Lock()
+
+
+def _templates_for(output_dir: Path) -> dict:
+    """Compiled templates whose bytecode persists under output_dir/.jinja_cache, so restarts skip parsing"""
+    key = os.fspath(output_dir)
+    templates = _template_sets.get(key)
+    if templates is None:
+        with _template_lock:
+            templates = _template_sets.get(key)
+            if templates is None:
+                cache_dir = output_dir / ".jinja_cache"
+                cache_dir.mkdir(exist_ok=True)
+                env = Environment(
+                    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+                    bytecode_cache=FileSystemBytecodeCache(directory=str(cache_dir)),
+                    autoescape=select_autoescape(["html"]),
+                    auto_reload=False,
+                    cache_size=-1,
+                    # Fail loudly on a variable a sender forgot to pass instead of rendering it blank
+                    undefined=StrictUndefined,
+                )
+                templates = {name: env.get_template(f"{name}.html") for name in _TEMPLATE_NAMES}
+                _template_sets[key] = templates
+    return templates
+
+
+def _iter_lines_reversed(data: mmap.mmap):
+    """Yield the lines of a mapped file from last to first without copying it whole"""
+    end = len(data)
+    if end and data[end - 1:end] == b"\n":
+        end -= 1
+    while end > 0:
+        start = data.rfind(b"\n", 0, end) + 1
+        yield data[start:end]
+        end = start - 1
+
+# Shared by every EmailService instance so email disk writes stay off the request path
+_email_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="email-io")
+logger = get_logger("email_service")
+
+# One O_APPEND descriptor per history index, kept open for the life of the process
+_index_fds: dict[str, int] = {}
+_index_lock = threading.Lock()
+
+
+def _index_fd(path: Path) -> int:
+    key = str(path)
+    fd = _index_fds.get(key)
+    if fd is None:
+        with _index_lock:
+            fd = _index_fds.get(key)
+            if fd is None:
+                fd = os.open(key, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+                _index_fds[key] = fd
+    return fd
+
+# Disambiguates emails to the same person within one second (the old names silently overwrote)
+_email_seq = itertools.count()
+
+
+@atexit.register
+def _close_index_fds() -> None:
+    for fd in _index_fds.values():
+        os.close(fd)
+    _index_fds.clear()
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """os.write until every byte is out; errors (e.g. ENOSPC) raise instead of truncating"""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        if written == 0:
+            raise OSError(f"write made no progress with {len(view)} bytes left")
+        view = view[written:]
+
+
+def _write_file(path: str, data: bytes) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o644)
+    try:
+        _write_all(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _format_scheduled_at(booking: Booking) -> str:
+    return f"{booking.scheduledAt:%Y-%m-%d %H:%M}"
 
 
 class EmailService:
@@ -14,44 +125,30 @@ class EmailService:
             output_dir = os.getenv("EMAIL_NOTIFICATIONS_DIR", "email_notifications")
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        # Append-only index of every email's metadata, one JSON object per line
+        self.history_path = self.output_dir / "history.jsonl"
+        self._output_prefix = os.fspath(self.output_dir) + os.sep
+        self._templates = _templates_for(self.output_dir)
+
+    def send_in_background(self, send: Callable[..., str], *args) -> Future:
+        """Run one of the send_* methods on the email I/O pool, logging any failure"""
+        def run() -> Optional[str]:
+            try:
+                return send(*args)
+            except Exception as e:
+                logger.warning("Email notification failed", email=send.__name__, error=str(e))
+                return None
+        return _email_io_pool.submit(run)
 
-    def send_booking_confirmation(self, customer: User, provider: User, service: Service, booking: Booking) -> str:
+    def send_booking_confirmation(self, customer: User, provider: User, service: Service, booking: Booking,
+                                  scheduled_at: Optional[str] = None) -> str:
         """Send booking confirmation email to customer"""
-        subject = f"Booking Confirmed - {service.title}"
+        subject = f"Booking Confirmed - {service.name}"
         
-        content = f"""
-        <html>
-        <body>
-            <h2>Booking Confirmation</h2>
-            <p>Hello {customer.profile.firstName} {customer.profile.lastName},</p>
-            
-            <p>Your booking has been confirmed! Here are the details:</p>
-            
-            <h3>Service Details</h3>
-            <ul>
-                <li><strong>Service:</strong> {service.title}</li>
-                <li><strong>Provider:</strong> {provider.profile.firstName} {provider.profile.lastName}</li>
-                <li><strong>Description:</strong> {service.description}</li>
-                <li><strong>Price:</strong> ${service.price} {service.currency}</li>
-                <li><strong>Duration:</strong> {service.duration} minutes</li>
-            </ul>
-            
-            <h3>Booking Details</h3>
-            <ul>
-                <li><strong>Booking ID:</strong> {booking.id}</li>
-                <li><strong>Scheduled Date:</strong> {booking.scheduledAt.strftime('%Y-%m-%d %H:%M')}</li>
-                <li><strong>Total Amount:</strong> ${booking.totalAmount}</li>
-                <li><strong>Status:</strong> {booking.status.value.title()}</li>
-                {f'<li><strong>Notes:</strong> {booking.notes}</li>' if booking.notes else ''}
-            </ul>
-            
-            <p>Thank you for using our service marketplace!</p>
-            
-            <hr>
-            <p><small>This is a mock email notification. In production, this would be sent via SMTP.</small></p>
-        </body>
-        </html>
-        """
+        content = self._templates["booking_confirmation"].render(
+            recipient=customer, customer=customer, provider=provider, service=service, booking=booking,
+            scheduled_at=scheduled_at or _format_scheduled_at(booking)
+        )
         
         return self._save_email(
             recipient=customer,
@@ -60,49 +157,15 @@ class EmailService:
             email_type="booking_confirmation"
         )
 
-    def send_booking_notification_to_provider(self, customer: User, provider: User, service: Service, booking: Booking) -> str:
+    def send_booking_notification_to_provider(self, customer: User, provider: User, service: Service, booking: Booking,
+                                              scheduled_at: Optional[str] = None) -> str:
         """Send new booking notification to service provider"""
-        subject = f"New Booking Received - {service.title}"
+        subject = f"New Booking Received - {service.name}"
         
-        content = f"""
-        <html>
-        <body>
-            <h2>New Booking Received</h2>
-            <p>Hello {provider.profile.firstName} {provider.profile.lastName},</p>
-            
-            <p>You have received a new booking for your service!</p>
-            
-            <h3>Customer Details</h3>
-            <ul>
-                <li><strong>Name:</strong> {customer.profile.firstName} {customer.profile.lastName}</li>
-                <li><strong>Email:</strong> {customer.email}</li>
-                <li><strong>Phone:</strong> {customer.profile.phone}</li>
-            </ul>
-            
-            <h3>Service Details</h3>
-            <ul>
-                <li><strong>Service:</strong> {service.title}</li>
-                <li><strong>Description:</strong> {service.description}</li>
-                <li><strong>Price:</strong> ${service.price} {service.currency}</li>
-                <li><strong>Duration:</strong> {service.duration} minutes</li>
-            </ul>
-            
-            <h3>Booking Details</h3>
-            <ul>
-                <li><strong>Booking ID:</strong> {booking.id}</li>
-                <li><strong>Scheduled Date:</strong> {booking.scheduledAt.strftime('%Y-%m-%d %H:%M')}</li>
-                <li><strong>Total Amount:</strong> ${booking.totalAmount}</li>
-                <li><strong>Status:</strong> {booking.status.value.title()}</li>
-                {f'<li><strong>Customer Notes:</strong> {booking.notes}</li>' if booking.notes else ''}
-            </ul>
-            
-            <p>Please confirm or update the booking status as needed.</p>
-            
-            <hr>
-            <p><small>This is a mock email notification. In production, this would be sent via SMTP.</small></p>
-        </body>
-        </html>
-        """
+        content = self._templates["booking_notification_provider"].render(
+            recipient=provider, customer=customer, provider=provider, service=service, booking=booking,
+            scheduled_at=scheduled_at or _format_scheduled_at(booking)
+        )
         
         return self._save_email(
             recipient=provider,
@@ -111,40 +174,22 @@ class EmailService:
             email_type="booking_notification_provider"
         )
 
+    def send_booking_pair(self, customer: User, provider: User, service: Service, booking: Booking) -> tuple[str, str]:
+        """Send the customer confirmation and provider notification for a new booking"""
+        scheduled_at = _format_scheduled_at(booking)
+        return (
+            self.send_booking_confirmation(customer, provider, service, booking, scheduled_at),
+            self.send_booking_notification_to_provider(customer, provider, service, booking, scheduled_at),
+        )
+
     def send_booking_update(self, customer: User, provider: User, service: Service, booking: Booking, old_status: BookingStatus) -> str:
         """Send booking update notification"""
-        subject = f"Booking Updated - {service.title}"
+        subject = f"Booking Updated - {service.name}"
         
-        content = f"""
-        <html>
-        <body>
-            <h2>Booking Status Updated</h2>
-            <p>Hello {customer.profile.firstName} {customer.profile.lastName},</p>
-            
-            <p>Your booking status has been updated:</p>
-            
-            <h3>Status Change</h3>
-            <ul>
-                <li><strong>Previous Status:</strong> {old_status.value.title()}</li>
-                <li><strong>New Status:</strong> {booking.status.value.title()}</li>
-            </ul>
-            
-            <h3>Service Details</h3>
-            <ul>
-                <li><strong>Service:</strong> {service.title}</li>
-                <li><strong>Provider:</strong> {provider.profile.firstName} {provider.profile.lastName}</li>
-                <li><strong>Scheduled Date:</strong> {booking.scheduledAt.strftime('%Y-%m-%d %H:%M')}</li>
-                <li><strong>Total Amount:</strong> ${booking.totalAmount}</li>
-                {f'<li><strong>Notes:</strong> {booking.notes}</li>' if booking.notes else ''}
-            </ul>
-            
-            <p>If you have any questions, please contact the service provider.</p>
-            
-            <hr>
-            <p><small>This is a mock email notification. In production, this would be sent via SMTP.</small></p>
-        </body>
-        </html>
-        """
+        content = self._templates["booking_update"].render(
+            recipient=customer, customer=customer, provider=provider, service=service, booking=booking, old_status=old_status,
+            scheduled_at=_format_scheduled_at(booking)
+        )
         
         return self._save_email(
             recipient=customer,
@@ -153,34 +198,15 @@ class EmailService:
             email_type="booking_update"
         )
 
-    def send_booking_cancellation(self, customer: User, provider: User, service: Service, booking: Booking) -> str:
+    def send_booking_cancellation(self, customer: User, provider: User, service: Service, booking: Booking,
+                                  scheduled_at: Optional[str] = None) -> str:
         """Send booking cancellation notification"""
-        subject = f"Booking Cancelled - {service.title}"
+        subject = f"Booking Cancelled - {service.name}"
         
-        content = f"""
-        <html>
-        <body>
-            <h2>Booking Cancelled</h2>
-            <p>Hello {customer.profile.firstName} {customer.profile.lastName},</p>
-            
-            <p>Your booking has been cancelled.</p>
-            
-            <h3>Booking Details</h3>
-            <ul>
-                <li><strong>Service:</strong> {service.title}</li>
-                <li><strong>Provider:</strong> {provider.profile.firstName} {provider.profile.lastName}</li>
-                <li><strong>Booking ID:</strong> {booking.id}</li>
-                <li><strong>Scheduled Date:</strong> {booking.scheduledAt.strftime('%Y-%m-%d %H:%M')}</li>
-                <li><strong>Total Amount:</strong> ${booking.totalAmount}</li>
-            </ul>
-            
-            <p>If you have any questions or would like to reschedule, please contact the service provider.</p>
-            
-            <hr>
-            <p><small>This is a mock email notification. In production, this would be sent via SMTP.</small></p>
-        </body>
-        </html>
-        """
+        content = self._templates["booking_cancellation"].render(
+            recipient=customer, customer=customer, provider=provider, service=service, booking=booking,
+            scheduled_at=scheduled_at or _format_scheduled_at(booking)
+        )
         
         return self._save_email(
             recipient=customer,
@@ -191,73 +217,89 @@ class EmailService:
 
     def _save_email(self, recipient: User, subject: str, content: str, email_type: str) -> str:
         """Save email to file (mock implementation)"""
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        filename = f"{recipient.profile.firstName}_{recipient.profile.lastName}_{email_type}_{timestamp}.html"
-        filepath = self.output_dir / filename
+        now = datetime.now(timezone.utc)
+        stem = (
+            f"{self._output_prefix}{recipient.profile.firstName}_{recipient.profile.lastName}_{email_type}_"
+            f"{now:%Y%m%d_%H%M%S}_{next(_email_seq):06d}"
+        )
+        filepath = stem + ".html"
         
         email_data = {
             "to": recipient.email,
             "to_name": f"{recipient.profile.firstName} {recipient.profile.lastName}",
             "subject": subject,
             "content": content,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": now.isoformat(),
             "type": email_type
         }
         
-        # Save as HTML file for easy viewing
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Encode both payloads up front so each file is a single unbuffered write
+        html_bytes = content.encode("utf-8")
+        json_bytes = orjson.dumps(email_data, option=orjson.OPT_INDENT_2, default=str)
+        
+        # Save as HTML file for easy viewing, plus metadata as JSON
+        _write_file(filepath, html_bytes)
+        _write_file(stem + ".json", json_bytes)
         
-        # Also save metadata as JSON
-        json_filepath = filepath.with_suffix('.json')
-        with open(json_filepath, 'w', encoding='utf-8') as f:
-            json.dump(email_data, f, indent=2, default=str)
+        # Record it in the history index; a single O_APPEND write lands whole at the end
+        self._append_index(orjson.dumps(email_data, default=str, option=orjson.OPT_APPEND_NEWLINE))
         
-        return str(filepath)
+        return filepath
+
+    def _append_index(self, line: bytes) -> None:
+        fd = _index_fd(self.history_path)
+        # A short write is finished off by a second write; the lock stops another append landing in between
+        with _index_lock:
+            _write_all(fd, line)
+
+    def get_email_history(self, user_email: Optional[str] = None, limit: Optional[int] = None) -> list:
+        """Get email history, newest first (for testing/debugging)"""
+        try:
+            index = open(self.history_path, "rb")
+        except FileNotFoundError:
+            # Directory predates the index; read the per-email metadata files instead
+            return self._scan_email_files(user_email, limit)
+        
+        # Cheap byte check so non-matching lines are never JSON-decoded
+        needle = b'"to":' + orjson.dumps(user_email) if user_email else None
+        emails = []
+        with index:
+            if os.fstat(index.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(index.fileno(), 0, prot=mmap.PROT_READ) as data:
+                for line in _iter_lines_reversed(data):
+                    if not line or (needle is not None and needle not in line):
+                        continue
+                    try:
+                        email_data = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # Corrupt, or the tail of an append that never finished
+                        continue
+                    if not user_email or email_data['to'] == user_email:
+                        emails.append(email_data)
+                        if limit is not None and len(emails) >= limit:
+                            break
+        return emails
 
-    def get_email_history(self, user_email: Optional[str] = None) -> list:
-        """Get email history (for testing/debugging)"""
+    def _scan_email_files(self, user_email: Optional[str], limit: Optional[int]) -> list:
+        """Email history from one metadata JSON file per email, newest first"""
         emails = []
         for json_file in self.output_dir.glob("*.json"):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                email_data = json.load(f)
-                if not user_email or email_data['to'] == user_email:
-                    emails.append(email_data)
-        return sorted(emails, key=lambda x: x['timestamp'], reverse=True)
+            try:
+                email_data = orjson.loads(json_file.read_bytes())
+            except (OSError, orjson.JSONDecodeError):
+                continue
+            if not user_email or email_data['to'] == user_email:
+                emails.append(email_data)
+        emails.sort(key=lambda x: x['timestamp'], reverse=True)
+        return emails if limit is None else emails[:limit]
 
     def send_password_reset_email(self, user: User, reset_token: str) -> str:
         """Send password reset email with reset link"""
         subject = "Password Reset Request - Service Marketplace"
         reset_link = f"http://localhost:3000/reset-password?token={reset_token}"  # Frontend URL placeholder
         
-        content = f"""
-        <html>
-        <body>
-            <h2>Password Reset Request</h2>
-            <p>Hello {user.profile.firstName} {user.profile.lastName},</p>
-            
-            <p>You have requested to reset your password for your Service Marketplace account.</p>
-            
-            <p>To reset your password, please click on the following link:</p>
-            <p><a href="{reset_link}" style="background-color: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Reset Password</a></p>
-            
-            <p>Or copy and paste this link into your browser:</p>
-            <p><code>{reset_link}</code></p>
-            
-            <p><strong>Important:</strong></p>
-            <ul>
-                <li>This link will expire in 24 hours for security reasons</li>
-                <li>If you did not request this password reset, please ignore this email</li>
-                <li>Do not share this link with anyone</li>
-            </ul>
-            
-            <p>Best regards,<br>The Service Marketplace Team</p>
-            
-            <hr>
-            <p><small>This is a mock email notification. In production, this would be sent via SMTP.</small></p>
-        </body>
-        </html>
-        """
+        content = self._templates["password_reset"].render(recipient=user, reset_link=reset_link)
         
         return self._save_email(user, subject, content, "password_reset")
 
@@ -265,22 +307,6 @@ class EmailService:
         """Send confirmation email after successful password reset"""
         subject = "Password Successfully Reset - Service Marketplace"
         
-        content = f"""
-        <html>
-        <body>
-            <h2>Password Successfully Reset</h2>
-            <p>Hello {user.profile.firstName} {user.profile.lastName},</p>
-            
-            <p>Your password has been successfully reset for your Service Marketplace account.</p>
-            
-            <p>If you did not make this change, please contact our support team immediately.</p>
-            
-            <p>Best regards,<br>The Service Marketplace Team</p>
-            
-            <hr>
-            <p><small>This is a mock email notification. In production, this would be sent via SMTP.</small></p>
-        </body>
-        </html>
-        """
+        content = self._templates["password_reset_confirmation"].render(recipient=user)
         
         return self._save_email(user, subject, content, "password_reset_confirmation")
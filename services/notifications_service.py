@@ -1,17 +1,73 @@
 from typing import List, Optional
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
-import json
 
 from models import Notification, NotificationCreateRequest, NotificationResponse, NotificationType
 from repositories.notifications_repository import NotificationsRepository
+from database import SessionLocal, after_commit, transaction
+from logging_config import get_logger
+from services import broadcast_channel
+from services.broadcast_channel import BroadcastChannel
+
+
+# NotificationType -> (title, message template) for the create_*_notification helpers
+_BOOKING_MESSAGES = {
+    NotificationType.BOOKING_CREATED: ("Booking Confirmed", "Your booking for '{service_title}' has been confirmed"),
+    NotificationType.BOOKING_UPDATED: ("Booking Updated", "Your booking for '{service_title}' has been updated"),
+    NotificationType.BOOKING_CANCELLED: ("Booking Cancelled", "Your booking for '{service_title}' has been cancelled"),
+}
+_BOOKING_DEFAULT = ("Booking Notification", "Update for your booking '{service_title}'")
+
+_PAYMENT_MESSAGES = {
+    NotificationType.PAYMENT_SUCCESS: ("Payment Successful", "Payment of {amount} {currency} has been processed successfully"),
+    NotificationType.PAYMENT_FAILED: ("Payment Failed", "Payment of {amount} {currency} could not be processed"),
+    NotificationType.REFUND_PROCESSED: ("Refund Processed", "Refund of {amount} {currency} has been processed"),
+}
+_PAYMENT_DEFAULT = ("Payment Notification", "Payment update: {amount} {currency}")
+
+_SERVICE_MESSAGES = {
+    NotificationType.SERVICE_CREATED: ("Service Created", "Your service '{service_title}' has been created successfully"),
+    NotificationType.SERVICE_UPDATED: ("Service Updated", "Your service '{service_title}' has been updated"),
+    NotificationType.SERVICE_DELETED: ("Service Deleted", "Your service '{service_title}' has been deleted"),
+}
+_SERVICE_DEFAULT = ("Service Notification", "Update for your service '{service_title}'")
+
+_notification_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="notifications")
+logger = get_logger("notifications_service")
+
+
+def notify_in_background(db: Session, helper: str, **kwargs) -> None:
+    """Run a create_*_notification helper on a worker thread once db's transaction commits.
+
+    The worker opens its own session on the same engine as db, so it never sees
+    (or publishes) rows the caller later rolls back.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    bind = db.get_bind()
+    after_commit(db, lambda: _notification_pool.submit(_run_notification, bind, loop, helper, kwargs))
+
+
+def _run_notification(bind: Engine, loop: Optional[asyncio.AbstractEventLoop], helper: str, kwargs: dict) -> None:
+    db = SessionLocal(bind=bind)
+    try:
+        getattr(NotificationsService(NotificationsRepository(db), loop=loop), helper)(**kwargs)
+    except Exception as e:
+        logger.warning("Background notification failed", helper=helper, error=str(e))
+    finally:
+        db.close()
 
 
 class NotificationsService:
-    def __init__(self, repository: NotificationsRepository):
+    def __init__(self, repository: NotificationsRepository, loop: Optional[asyncio.AbstractEventLoop] = None):
         self.repository = repository
-        self._subscribers: dict = {}  # user_id -> list of SSE connections
+        # Event loop that owns the SSE streams, for services running on worker threads
+        self._loop = loop
 
     def create_notification(self, notification_data: NotificationCreateRequest) -> NotificationResponse:
         """Create a new notification"""
@@ -23,10 +79,19 @@ class NotificationsService:
             data=notification_data.data
         )
         
-        created_notification = self.repository.create_notification(notification)
+        with transaction(self.repository.db):
+            created_notification = self.repository.create_notification(notification)
         
         # Send real-time notification to subscribers
-        asyncio.create_task(self._broadcast_to_user(notification_data.userId, created_notification))
+        broadcast = self._broadcast_to_user(notification_data.userId, created_notification)
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(broadcast, self._loop)
+        else:
+            try:
+                asyncio.get_running_loop().create_task(broadcast)
+            except RuntimeError:
+                # No event loop means no SSE stream can be listening
+                broadcast.close()
         
         return self._to_response(created_notification)
 
@@ -40,58 +105,43 @@ class NotificationsService:
 
     def mark_as_read(self, notification_id: str, user_id: str) -> bool:
         """Mark a notification as read"""
-        return self.repository.mark_notification_as_read(notification_id, user_id)
+        with transaction(self.repository.db):
+            return self.repository.mark_notification_as_read(notification_id, user_id)
 
     def mark_all_as_read(self, user_id: str) -> int:
         """Mark all notifications as read for a user"""
-        return self.repository.mark_all_notifications_as_read(user_id)
+        with transaction(self.repository.db):
+            return self.repository.mark_all_notifications_as_read(user_id)
 
     def delete_notification(self, notification_id: str, user_id: str) -> bool:
         """Delete a notification"""
-        return self.repository.delete_notification(notification_id, user_id)
+        with transaction(self.repository.db):
+            return self.repository.delete_notification(notification_id, user_id)
 
     def get_notification_count(self, user_id: str) -> dict:
         """Get notification counts for a user"""
         return self.repository.get_notification_count(user_id)
 
-    def subscribe_to_notifications(self, user_id: str, connection):
+    def subscribe_to_notifications(self, user_id: str) -> BroadcastChannel:
         """Subscribe a user to real-time notifications"""
-        if user_id not in self._subscribers:
-            self._subscribers[user_id] = []
-        self._subscribers[user_id].append(connection)
+        return broadcast_channel.subscribe(user_id)
 
-    def unsubscribe_from_notifications(self, user_id: str, connection):
+    def unsubscribe_from_notifications(self, user_id: str):
         """Unsubscribe a user from real-time notifications"""
-        if user_id in self._subscribers:
-            try:
-                self._subscribers[user_id].remove(connection)
-                if not self._subscribers[user_id]:
-                    del self._subscribers[user_id]
-            except ValueError:
-                pass  # Connection not found
+        broadcast_channel.unsubscribe(user_id)
 
     async def _broadcast_to_user(self, user_id: str, notification: Notification):
         """Broadcast notification to all subscribers of a user"""
-        if user_id in self._subscribers:
+        channel = broadcast_channel.get_channel(user_id)
+        if channel is not None:
             notification_data = self._to_response(notification)
-            message = f"data: {json.dumps(notification_data.dict())}\n\n"
-            
-            # Send to all connections for this user
-            connections_to_remove = []
-            for connection in self._subscribers[user_id]:
-                try:
-                    await connection.put(message)
-                except Exception:
-                    # Connection is closed, mark for removal
-                    connections_to_remove.append(connection)
-            
-            # Remove closed connections
-            for connection in connections_to_remove:
-                self.unsubscribe_from_notifications(user_id, connection)
+            # Serialized and stored once; every open stream for the user reads the same message
+            message = b"data: " + notification_data.model_dump_json().encode() + b"\n\n"
+            await channel.publish(message)
 
     def _to_response(self, notification: Notification) -> NotificationResponse:
         """Convert Notification to NotificationResponse"""
-        return NotificationResponse(
+        return NotificationResponse.model_construct(
             id=notification.id,
             userId=notification.userId,
             type=notification.type,
@@ -107,18 +157,8 @@ class NotificationsService:
     def create_booking_notification(self, user_id: str, booking_id: str, notification_type: NotificationType, 
                                   service_title: str, scheduled_at: str = None):
         """Create a booking-related notification"""
-        if notification_type == NotificationType.BOOKING_CREATED:
-            title = "Booking Confirmed"
-            message = f"Your booking for '{service_title}' has been confirmed"
-        elif notification_type == NotificationType.BOOKING_UPDATED:
-            title = "Booking Updated"
-            message = f"Your booking for '{service_title}' has been updated"
-        elif notification_type == NotificationType.BOOKING_CANCELLED:
-            title = "Booking Cancelled"
-            message = f"Your booking for '{service_title}' has been cancelled"
-        else:
-            title = "Booking Notification"
-            message = f"Update for your booking '{service_title}'"
+        title, template = _BOOKING_MESSAGES.get(notification_type, _BOOKING_DEFAULT)
+        message = template.format(service_title=service_title)
 
         data = {
             "bookingId": booking_id,
@@ -139,18 +179,8 @@ class NotificationsService:
     def create_payment_notification(self, user_id: str, payment_id: str, notification_type: NotificationType,
                                   amount: float, currency: str, service_title: str = None):
         """Create a payment-related notification"""
-        if notification_type == NotificationType.PAYMENT_SUCCESS:
-            title = "Payment Successful"
-            message = f"Payment of {amount} {currency} has been processed successfully"
-        elif notification_type == NotificationType.PAYMENT_FAILED:
-            title = "Payment Failed"
-            message = f"Payment of {amount} {currency} could not be processed"
-        elif notification_type == NotificationType.REFUND_PROCESSED:
-            title = "Refund Processed"
-            message = f"Refund of {amount} {currency} has been processed"
-        else:
-            title = "Payment Notification"
-            message = f"Payment update: {amount} {currency}"
+        title, template = _PAYMENT_MESSAGES.get(notification_type, _PAYMENT_DEFAULT)
+        message = template.format(amount=amount, currency=currency)
 
         data = {
             "paymentId": payment_id,
@@ -172,18 +202,8 @@ class NotificationsService:
     def create_service_notification(self, user_id: str, service_id: str, notification_type: NotificationType,
                                   service_title: str):
         """Create a service-related notification"""
-        if notification_type == NotificationType.SERVICE_CREATED:
-            title = "Service Created"
-            message = f"Your service '{service_title}' has been created successfully"
-        elif notification_type == NotificationType.SERVICE_UPDATED:
-            title = "Service Updated"
-            message = f"Your service '{service_title}' has been updated"
-        elif notification_type == NotificationType.SERVICE_DELETED:
-            title = "Service Deleted"
-            message = f"Your service '{service_title}' has been deleted"
-        else:
-            title = "Service Notification"
-            message = f"Update for your service '{service_title}'"
+        title, template = _SERVICE_MESSAGES.get(notification_type, _SERVICE_DEFAULT)
+        message = template.format(service_title=service_title)
 
         data = {
             "serviceId": service_id,
@@ -1,15 +1,16 @@
 from typing import Optional
 import secrets
-import string
-from datetime import datetime, timezone
 
 from models import User, PasswordResetRequest, PasswordResetConfirmRequest, PasswordResetToken
 from repositories.password_reset_repository import PasswordResetRepository
 from repositories.users_repository import UsersRepository
 from services.email_service import EmailService
 from auth import get_password_hash
+from database import transaction
+from logging_config import get_logger, log_throttled
 
-from sqlalchemy import text, update
+
+logger = get_logger("password_reset_service")
 
 
 class PasswordResetService:
@@ -31,13 +32,14 @@ class PasswordResetService:
         
         # Create reset token in database
         try:
-            self.reset_repo.create_reset_token(request.email, reset_token)
+            with transaction(self.reset_repo.db):
+                self.reset_repo.create_reset_token(request.email, reset_token)
             
             # Send password reset email
-            self.email_service.send_password_reset_email(user, reset_token)
+            self.email_service.send_in_background(self.email_service.send_password_reset_email, user, reset_token)
             return True
         except Exception as e:
-            print(f"Error creating password reset: {e}")
+            log_throttled(logger, "Password reset request failed", error=str(e))
             return False
 
     def confirm_password_reset(self, request: PasswordResetConfirmRequest) -> bool:
@@ -58,28 +60,25 @@ class PasswordResetService:
             
             # Update password in database
             
-            query = update(text("users")).where(text("email = :email")).values(
-                password=hashed_password,
-                updated_at=datetime.now(timezone.utc)
-            )
-            self.users_repo.db.execute(query, {"email": reset_token.email})
-            self.users_repo.db.commit()
+            with transaction(self.users_repo.db):
+                self.users_repo.update_password_by_email(reset_token.email, hashed_password)
 
-            # Mark token as used
-            self.reset_repo.mark_token_as_used(request.token)
+                # Mark token as used
+                self.reset_repo.mark_token_as_used(request.token)
 
             # Send confirmation email
-            self.email_service.send_password_reset_confirmation(user)
+            self.email_service.send_in_background(self.email_service.send_password_reset_confirmation, user)
             return True
         except Exception as e:
-            print(f"Error updating password: {e}")
+            log_throttled(logger, "Password reset confirmation failed", error=str(e))
             return False
 
     def _generate_reset_token(self, length: int = 32) -> str:
         """Generate a secure random token"""
-        alphabet = string.ascii_letters + string.digits
-        return ''.join(secrets.choice(alphabet) for _ in range(length))
+        # Every 3 random bytes encode to 4 URL-safe characters (24 bytes -> 32 chars)
+        return secrets.token_urlsafe(-(-length * 3 // 4))[:length]
 
     def cleanup_expired_tokens(self) -> int:
         """Clean up expired tokens"""
-        return self.reset_repo.cleanup_expired_tokens()
+        with transaction(self.reset_repo.db):
+            return self.reset_repo.cleanup_expired_tokens()
@@ -1,18 +1,62 @@
 import random
 import os
+import re
+import threading
+from functools import lru_cache
+from cachetools import TTLCache
 from typing import Optional
 from datetime import datetime, timezone
 
 from models import PaymentRequest, PaymentResponse, RefundRequest, RefundResponse, PaymentMethod, NotificationType
 from repositories.payments_repository import PaymentsRepository
-from services.notifications_service import NotificationsService
-from repositories.notifications_repository import NotificationsRepository
+from services.notifications_service import notify_in_background
+from database import transaction
+
+
+# Short-TTL read caches for status polling; shared by every request in the worker.
+# Writes made through this service invalidate their entries; the TTL bounds staleness
+# for writes made elsewhere (other workers, scripts).
+_payment_cache: TTLCache = TTLCache(maxsize=10_000, ttl=5)
+_booking_payment_cache: TTLCache = TTLCache(maxsize=10_000, ttl=5)
+_cache_lock = threading.Lock()
+
+
+def _invalidate_payment(payment_id: str, booking_id: Optional[str] = None) -> None:
+    with _cache_lock:
+        _payment_cache.pop(payment_id, None)
+        if booking_id is not None:
+            _booking_payment_cache.pop(booking_id, None)
+
+
+_FAILURE_REASONS = (
+    "Insufficient funds",
+    "Card declined by bank",
+    "Invalid card number",
+    "Expired card",
+    "CVV verification failed",
+    "Transaction timeout",
+    "Network error",
+    "Card blocked",
+    "Daily limit exceeded",
+    "Fraud detection triggered",
+)
+
+_DIGITS = re.compile(r"[0-9]+")
+
+
+def _is_ascii_digits(value: str) -> bool:
+    # fullmatch on [0-9] also rejects the non-ASCII digits str.isdigit() accepts
+    return _DIGITS.fullmatch(value) is not None
+
+
+@lru_cache(maxsize=8)
+def _parse_failure_rate(raw: str) -> float:
+    return float(raw)
 
 
 class PaymentsService:
     def __init__(self, payments_repo: PaymentsRepository):
         self.payments_repo = payments_repo
-        self.notifications_service = NotificationsService(NotificationsRepository(payments_repo.db))
 
     def process_payment(self, payment_request: PaymentRequest) -> PaymentResponse:
         """Process payment with configurable random failure rate"""
@@ -26,7 +70,7 @@ class PaymentsService:
         )
 
         # Get failure rate from environment variable (default 10%)
-        failure_rate = float(os.getenv("PAYMENT_FAILURE_RATE", "0.1"))
+        failure_rate = _parse_failure_rate(os.getenv("PAYMENT_FAILURE_RATE", "0.1"))
         
         # Mock payment processing with configurable failure rate
         if random.random() < failure_rate:
@@ -35,33 +79,28 @@ class PaymentsService:
         else:
             payment.status = "completed"
 
-        # Save payment to database
-        saved_payment = self.payments_repo.create_payment(payment)
+        with transaction(self.payments_repo.db):
+            # Save payment to database
+            saved_payment = self.payments_repo.create_payment(payment)
+        _invalidate_payment(saved_payment.id, saved_payment.bookingId)
         
-        # Send real-time notification
-        try:
-            # Get user ID from booking (we'll need to modify this to get the actual user)
-            # For now, we'll use a placeholder - in a real app, you'd get this from the booking
-            user_id = "customer@example.com"  # This should be retrieved from the booking
-            
-            if saved_payment.status == "completed":
-                self.notifications_service.create_payment_notification(
-                    user_id=user_id,
-                    payment_id=saved_payment.id,
-                    notification_type=NotificationType.PAYMENT_SUCCESS,
-                    amount=saved_payment.amount,
-                    currency=saved_payment.currency
-                )
-            else:
-                self.notifications_service.create_payment_notification(
-                    user_id=user_id,
-                    payment_id=saved_payment.id,
-                    notification_type=NotificationType.PAYMENT_FAILED,
-                    amount=saved_payment.amount,
-                    currency=saved_payment.currency
-                )
-        except Exception as e:
-            print(f"Payment notification failed: {e}")
+        # Send real-time notification off the request path, once any enclosing
+        # transaction (e.g. the booking that owns this payment) has committed
+        # Get user ID from booking (we'll need to modify this to get the actual user)
+        # For now, we'll use a placeholder - in a real app, you'd get this from the booking
+        user_id = "customer@example.com"  # This should be retrieved from the booking
+        notify_in_background(
+            self.payments_repo.db,
+            "create_payment_notification",
+            user_id=user_id,
+            payment_id=saved_payment.id,
+            notification_type=(
+                NotificationType.PAYMENT_SUCCESS if saved_payment.status == "completed"
+                else NotificationType.PAYMENT_FAILED
+            ),
+            amount=saved_payment.amount,
+            currency=saved_payment.currency
+        )
         
         return saved_payment
 
@@ -84,37 +123,53 @@ class PaymentsService:
             reason=reason or "Customer requested refund"
         )
 
-        # Save refund to database
-        refund = self.payments_repo.create_refund(refund)
-
-        # Update payment status to refunded
-        self.payments_repo.update_payment_status(payment_id, "refunded")
+        # Status update and refund row go out as one statement; the update only
+        # matches a still-completed payment, so a concurrent refund gets None
+        with transaction(self.payments_repo.db):
+            refund = self.payments_repo.refund_and_mark(refund)
+        if not refund:
+            return None
+        _invalidate_payment(payment_id, payment.bookingId)
         
-        # Send real-time notification
-        try:
-            # Get user ID from booking (we'll need to modify this to get the actual user)
-            # For now, we'll use a placeholder - in a real app, you'd get this from the booking
-            user_id = "customer@example.com"  # This should be retrieved from the booking
-            
-            self.notifications_service.create_payment_notification(
-                user_id=user_id,
-                payment_id=payment_id,
-                notification_type=NotificationType.REFUND_PROCESSED,
-                amount=refund.amount,
-                currency=payment.currency
-            )
-        except Exception as e:
-            print(f"Refund notification failed: {e}")
+        # Send real-time notification off the request path
+        # Get user ID from booking (we'll need to modify this to get the actual user)
+        # For now, we'll use a placeholder - in a real app, you'd get this from the booking
+        user_id = "customer@example.com"  # This should be retrieved from the booking
+        notify_in_background(
+            self.payments_repo.db,
+            "create_payment_notification",
+            user_id=user_id,
+            payment_id=payment_id,
+            notification_type=NotificationType.REFUND_PROCESSED,
+            amount=refund.amount,
+            currency=payment.currency
+        )
 
         return refund
 
     def get_payment_status(self, payment_id: str) -> Optional[PaymentResponse]:
         """Get payment status by ID"""
-        return self.payments_repo.get_payment(payment_id)
+        with _cache_lock:
+            cached = _payment_cache.get(payment_id)
+        if cached is not None:
+            return cached
+        payment = self.payments_repo.get_payment(payment_id)
+        if payment:
+            with _cache_lock:
+                _payment_cache[payment_id] = payment
+        return payment
 
     def get_payment_by_booking(self, booking_id: str) -> Optional[PaymentResponse]:
         """Get payment by booking ID"""
-        return self.payments_repo.get_payment_by_booking(booking_id)
+        with _cache_lock:
+            cached = _booking_payment_cache.get(booking_id)
+        if cached is not None:
+            return cached
+        payment = self.payments_repo.get_payment_by_booking(booking_id)
+        if payment:
+            with _cache_lock:
+                _booking_payment_cache[booking_id] = payment
+        return payment
 
     def get_refunds(self, payment_id: str) -> list[RefundResponse]:
         """Get all refunds for a payment"""
@@ -122,38 +177,21 @@ class PaymentsService:
 
     def _get_random_failure_reason(self) -> str:
         """Get a random failure reason for testing"""
-        failure_reasons = [
-            "Insufficient funds",
-            "Card declined by bank",
-            "Invalid card number",
-            "Expired card",
-            "CVV verification failed",
-            "Transaction timeout",
-            "Network error",
-            "Card blocked",
-            "Daily limit exceeded",
-            "Fraud detection triggered"
-        ]
-        return random.choice(failure_reasons)
+        return random.choice(_FAILURE_REASONS)
 
     def validate_payment_method(self, payment_method: PaymentMethod) -> tuple[bool, Optional[str]]:
         """Validate payment method (basic validation)"""
         # Check card number format (basic validation)
-        if not payment_method.cardNumber.isdigit():
+        if not _is_ascii_digits(payment_method.cardNumber):
             return False, "Card number must contain only digits"
 
-        # Check expiry date
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-        
-        if payment_method.expiryYear < current_year:
-            return False, "Card has expired"
-        
-        if payment_method.expiryYear == current_year and payment_method.expiryMonth < current_month:
+        # Check expiry date as a single YYYYMM comparison
+        now = datetime.now()
+        if payment_method.expiryYear * 100 + payment_method.expiryMonth < now.year * 100 + now.month:
             return False, "Card has expired"
 
         # Check CVV format
-        if not payment_method.cvv.isdigit():
+        if not _is_ascii_digits(payment_method.cvv):
             return False, "CVV must contain only digits"
 
         return True, None
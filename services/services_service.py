@@ -1,9 +1,9 @@
 from typing import List, Optional
-from datetime import datetime, timezone
 
 from models import Service, ServiceCreateRequest, ServiceResponse
 from repositories.services_repository import ServicesRepository
 from repositories.users_repository import UsersRepository
+from database import transaction
 
 
 class ServicesService:
@@ -22,64 +22,51 @@ class ServicesService:
     def create_service(self, provider_email: str, payload: ServiceCreateRequest) -> ServiceResponse:
         # Note: Role validation should be done in controller layer
         # Service layer focuses on business logic and ownership validation
-        
-        # Get provider's UUID from email
-        if self.users_repository:
-            provider = self.users_repository.get_by_email(provider_email)
-            if not provider:
-                raise ValueError(f"Provider with email {provider_email} not found")
-            provider_id = provider.id
-        else:
-            # Fallback: assume provider_email is the ID (should not happen in production)
-            provider_id = provider_email
-        
-        service = Service(
-            providerId=provider_id,
-            name=payload.name,
-            description=payload.description,
-            price=payload.price,
-            durationMinutes=payload.durationMinutes,
-            availability=payload.availability,
-            status="PENDING"
-        )
-        created = self.repository.create_service(service)
+        service = self._new_service(self._provider_id(provider_email), payload)
+        with transaction(self.repository.db):
+            created = self.repository.create_service(service)
         return self._to_response(created)
 
+    def create_services_batch(self, provider_email: str, payloads: List[ServiceCreateRequest]) -> List[ServiceResponse]:
+        """Create many services for one provider with a single provider lookup and one batched insert"""
+        provider_id = self._provider_id(provider_email)
+        services = [self._new_service(provider_id, p) for p in payloads]
+        with transaction(self.repository.db):
+            created = self.repository.create_services_batch(services)
+        return [self._to_response(s) for s in created]
+
     def update_service(self, service_id: str, payload: ServiceCreateRequest, current_user_email: str) -> Optional[ServiceResponse]:
         """Update a service with authorization check - only the service provider can update"""
         # Note: Role validation should be done in controller layer
         # Service layer focuses on business logic and ownership validation
         
-        existing = self.repository.get_service(service_id)
+        # Authorization check: only the service provider can update their own service.
+        # The ownership test runs in SQL, so missing and not-owned both come back as None.
+        existing = self.repository.get_service_owned_by(service_id, current_user_email)
         if not existing:
-            return None
-        
-        # Get current user's UUID from email
-        if self.users_repository:
-            current_user = self.users_repository.get_by_email(current_user_email)
-            if not current_user:
-                return None
-            current_user_id = current_user.id
-        else:
-            current_user_id = current_user_email
-        
-        # Authorization check: only the service provider can update their own service
-        if existing.providerId != current_user_id:
             return None  # Service layer returns None for unauthorized access
         
-        updated = Service(
-            id=existing.id,
-            providerId=existing.providerId,
-            name=payload.name,
-            description=payload.description,
-            price=payload.price,
-            durationMinutes=payload.durationMinutes,
-            availability=payload.availability,
-            status=existing.status,
-            createdAt=existing.createdAt,
-            updatedAt=datetime.now(timezone.utc)
-        )
-        saved = self.repository.update_service(service_id, updated)
+        # Only send the columns that actually changed
+        candidates = {
+            "name": payload.name,
+            "description": payload.description,
+            "price": payload.price,
+            "duration_minutes": payload.durationMinutes,
+            "availability": payload.availability,
+        }
+        current = {
+            "name": existing.name,
+            "description": existing.description,
+            "price": existing.price,
+            "duration_minutes": existing.durationMinutes,
+            "availability": existing.availability,
+        }
+        changes = {column: value for column, value in candidates.items() if current[column] != value}
+        if not changes:
+            return self._to_response(existing)
+
+        with transaction(self.repository.db):
+            saved = self.repository.update_service(service_id, changes)
         return self._to_response(saved) if saved else None
 
 
@@ -89,27 +76,39 @@ class ServicesService:
         # Note: Role validation should be done in controller layer
         # Service layer focuses on business logic and ownership validation
         
-        existing = self.repository.get_service(service_id)
-        if not existing:
-            return False
-        
-        # Get current user's UUID from email
+        # Authorization check: only the service provider can delete their own service.
+        # Existence, ownership and the delete are a single statement; False covers all misses.
+        with transaction(self.repository.db):
+            return self.repository.delete_service_owned_by(service_id, current_user_email)
+
+    def delete_services_batch(self, service_ids: List[str], current_user_email: str) -> List[str]:
+        """Delete the listed services the user owns in one statement; ids they don't own are skipped"""
+        with transaction(self.repository.db):
+            return self.repository.delete_services_owned_by(service_ids, current_user_email)
+
+    def _provider_id(self, provider_email: str) -> str:
+        # Get provider's UUID from email
         if self.users_repository:
-            current_user = self.users_repository.get_by_email(current_user_email)
-            if not current_user:
-                return False
-            current_user_id = current_user.id
-        else:
-            current_user_id = current_user_email
-        
-        # Authorization check: only the service provider can delete their own service
-        if existing.providerId != current_user_id:
-            return False  # Service layer returns False for unauthorized access
-        
-        return self.repository.delete_service(service_id)
+            provider = self.users_repository.get_by_email(provider_email)
+            if not provider:
+                raise ValueError(f"Provider with email {provider_email} not found")
+            return provider.id
+        # Fallback: assume provider_email is the ID (should not happen in production)
+        return provider_email
+
+    def _new_service(self, provider_id: str, payload: ServiceCreateRequest) -> Service:
+        return Service(
+            providerId=provider_id,
+            name=payload.name,
+            description=payload.description,
+            price=payload.price,
+            durationMinutes=payload.durationMinutes,
+            availability=payload.availability,
+            status="PENDING"
+        )
 
     def _to_response(self, s: Service) -> ServiceResponse:
-        return ServiceResponse(
+        return ServiceResponse.model_construct(
             id=s.id,
             providerId=s.providerId,
             name=s.name,
@@ -1,36 +1,43 @@
 import asyncio
-import json
-from typing import Dict, List, Optional
+import time
+import orjson
+from typing import List
 from fastapi import Request
 from fastapi.responses import StreamingResponse
 from datetime import datetime, timezone
 
-from services.notifications_service import NotificationsService
+from services import broadcast_channel
+from logging_config import get_logger, log_throttled
 
 
-class SSEManager:
-    def __init__(self):
-        self._connections: Dict[str, List[asyncio.Queue]] = {}
-        self._notifications_service: Optional[NotificationsService] = None
+_PING_PREFIX = b'data: {"type": "ping", "timestamp": "'
+_PING_SUFFIX = b'"}\n\n'
+_ping_cache = (0, b"")
+logger = get_logger("sse_manager")
+
+
+def _ping_frame() -> bytes:
+    """Keep-alive frame, rebuilt at most once per second and shared by every connection"""
+    global _ping_cache
+    second = int(time.time())
+    cached_second, frame = _ping_cache
+    if cached_second != second:
+        frame = _PING_PREFIX + datetime.now(timezone.utc).isoformat().encode() + _PING_SUFFIX
+        _ping_cache = (second, frame)
+    return frame
 
-    def set_notifications_service(self, notifications_service: NotificationsService):
-        """Set the notifications service for broadcasting"""
-        self._notifications_service = notifications_service
+
+class SSEManager:
+    """Streams per-user SSE connections off the shared broadcast_channel registry"""
 
     async def add_connection(self, user_id: str, request: Request) -> StreamingResponse:
         """Add a new SSE connection for a user"""
-        if user_id not in self._connections:
-            self._connections[user_id] = []
-        
-        # Create a queue for this connection
-        queue = asyncio.Queue()
-        self._connections[user_id].append(queue)
-        
-        # Subscribe to notifications service if available
-        if self._notifications_service:
-            self._notifications_service.subscribe_to_notifications(user_id, queue)
+        # Every stream for the user reads from one shared channel
+        channel = broadcast_channel.subscribe(user_id)
+        seq = channel.next_seq
         
         async def event_generator():
+            nonlocal seq
             try:
                 while True:
                     # Check if client disconnected
@@ -38,18 +45,25 @@ class SSEManager:
                         break
                     
                     try:
-                        # Wait for a message with timeout
-                        message = await asyncio.wait_for(queue.get(), timeout=30.0)
-                        yield message
+                        # Wait for new messages with timeout
+                        next_seq, messages = await channel.read(seq, timeout=30.0)
+                        # The channel buffer is bounded and drops oldest; a stream that
+                        # fell behind it skips what was evicted instead of growing memory
+                        dropped = next_seq - seq - len(messages)
+                        if dropped:
+                            log_throttled(logger, "SSE stream fell behind, messages dropped", user_id=user_id, dropped=dropped)
+                        seq = next_seq
+                        for message in messages:
+                            yield message
                     except asyncio.TimeoutError:
                         # Send keep-alive ping
-                        yield "data: {\"type\": \"ping\", \"timestamp\": \"" + datetime.now(timezone.utc).isoformat() + "\"}\n\n"
+                        yield _ping_frame()
                     except Exception as e:
-                        print(f"Error in SSE connection: {e}")
+                        log_throttled(logger, "SSE connection failed", user_id=user_id, error=str(e))
                         break
             finally:
                 # Clean up connection
-                self._remove_connection(user_id, queue)
+                broadcast_channel.unsubscribe(user_id)
 
         return StreamingResponse(
             event_generator(),
@@ -62,59 +76,31 @@ class SSEManager:
             }
         )
 
-    def _remove_connection(self, user_id: str, queue: asyncio.Queue):
-        """Remove a connection from the manager"""
-        if user_id in self._connections:
-            try:
-                self._connections[user_id].remove(queue)
-                if not self._connections[user_id]:
-                    del self._connections[user_id]
-            except ValueError:
-                pass  # Queue not found
-
     async def send_to_user(self, user_id: str, data: dict):
         """Send data to all connections for a specific user"""
-        if user_id in self._connections:
-            message = f"data: {json.dumps(data)}\n\n"
-            connections_to_remove = []
-            
-            for queue in self._connections[user_id]:
-                try:
-                    await queue.put(message)
-                except Exception:
-                    # Connection is closed, mark for removal
-                    connections_to_remove.append(queue)
-            
-            # Remove closed connections
-            for queue in connections_to_remove:
-                self._remove_connection(user_id, queue)
+        channel = broadcast_channel.get_channel(user_id)
+        if channel is not None:
+            channel.publish_nowait(b"data: " + orjson.dumps(data, default=str) + b"\n\n")
 
     async def send_to_all(self, data: dict):
         """Send data to all connected users"""
-        message = f"data: {json.dumps(data)}\n\n"
-        all_connections_to_remove = []
-        
-        for user_id, queues in self._connections.items():
-            user_connections_to_remove = []
-            for queue in queues:
-                try:
-                    await queue.put(message)
-                except Exception:
-                    user_connections_to_remove.append(queue)
-            
-            # Remove closed connections for this user
-            for queue in user_connections_to_remove:
-                self._remove_connection(user_id, queue)
+        message = b"data: " + orjson.dumps(data, default=str) + b"\n\n"
+        # One synchronous pass over a snapshot: publishing never blocks or fails per channel,
+        # so there is nothing to gather and nothing to clean up afterwards
+        for channel in list(broadcast_channel.all_channels().values()):
+            channel.publish_nowait(message)
 
     def get_connection_count(self, user_id: str = None) -> int:
         """Get the number of active connections"""
+        channels = broadcast_channel.all_channels()
         if user_id:
-            return len(self._connections.get(user_id, []))
-        return sum(len(queues) for queues in self._connections.values())
+            channel = channels.get(user_id)
+            return channel.readers if channel else 0
+        return sum(channel.readers for channel in channels.values())
 
     def get_connected_users(self) -> List[str]:
         """Get list of users with active connections"""
-        return list(self._connections.keys())
+        return list(broadcast_channel.all_channels().keys())
 
 
 # Global SSE manager instance
@@ -1,9 +1,10 @@
 from typing import List, Optional
 
-from models import User, UserCreateRequest, UserResponse, UserRole
+from models import User, UserCreateRequest, UserResponse, UserRole, UserCredentials
 from repositories.users_repository import UsersRepository
 from auth import get_password_hash, verify_password
-from logging_config import get_logger, log_database_operation, log_business_event
+from database import transaction
+from logging_config import get_logger
 
 '''
 DO NOT REMOVE THIS COMMENT.
@@ -17,27 +18,20 @@ class UsersService:
         self.logger = get_logger("users_service")
 
     def list_users(self, role: Optional[UserRole] = None) -> List[UserResponse]:
-        self.logger.info("Listing users", role_filter=role)
         users = self.repository.list_users(role)
-        log_database_operation("SELECT", "users", filters={"role": str(role) if role else None})
-        self.logger.info("Users retrieved", count=len(users), role_filter=role)
+        self.logger.info("Users retrieved", operation="SELECT", table="users", count=len(users), role_filter=role)
         return [self._to_response(u) for u in users]
 
     def get_user_by_email(self, email: str) -> Optional[UserResponse]:
-        self.logger.info("Getting user by email", email=email)
         u = self.repository.get_by_email(email)
-        log_database_operation("SELECT", "users", filters={"email": email})
-        
         if u:
-            self.logger.info("User found", user_id=u.id, email=email)
+            self.logger.info("User found", operation="SELECT", table="users", user_id=u.id, email=email)
             return self._to_response(u)
         else:
             self.logger.warning("User not found", email=email)
             return None
 
     def create_user(self, payload: UserCreateRequest) -> Optional[UserResponse]:
-        self.logger.info("Creating user", email=payload.email, role=payload.role)
-        
         # Check if user already exists
         existing_user = self.repository.get_by_email(payload.email)
         if existing_user:
@@ -52,10 +46,10 @@ class UsersService:
                 role=payload.role,
                 profile=payload.profile,
             )
-            created = self.repository.create_user(user)
-            log_database_operation("INSERT", "users", record_id=created.id)
-            log_business_event("user_created", "user", created.id, email=payload.email, role=payload.role)
-            self.logger.info("User created successfully", user_id=created.id, email=payload.email, role=payload.role)
+            with transaction(self.repository.db):
+                created = self.repository.create_user(user)
+            # The controller records the user_created business event
+            self.logger.info("User created", operation="INSERT", table="users", user_id=created.id, email=payload.email, role=payload.role)
             return self._to_response(created)
         except ValueError as e:
             # Handle duplicate email error from repository
@@ -65,21 +59,19 @@ class UsersService:
             self.logger.error("User creation failed", email=payload.email, error=str(e))
             raise e
 
-    def verify_user_password(self, email: str, password: str) -> Optional[User]:
+    def verify_user_password(self, email: str, password: str) -> Optional[UserCredentials]:
         """Verify user password for authentication"""
-        self.logger.info("Verifying user password", email=email)
-        user = self.repository.get_by_email(email)
+        user = self.repository.get_by_email_for_auth(email)
         if not user:
             self.logger.warning("Password verification failed - user not found", email=email)
             return None
         if not verify_password(password, user.password):
             self.logger.warning("Password verification failed - invalid password", email=email, user_id=user.id)
             return None
-        self.logger.info("Password verification successful", email=email, user_id=user.id)
         return user
 
     def _to_response(self, u: User) -> UserResponse:
-        return UserResponse(
+        return UserResponse.model_construct(
             id=u.id,
             email=u.email,
             role=u.role,
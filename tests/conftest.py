@@ -3,14 +3,20 @@ Pytest configuration and fixtures for testing
 """
 import pytest
 import os
+import tempfile
 from datetime import datetime, timedelta, timezone
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
+from cachetools import TTLCache
 
 # Set test environment
 os.environ["TESTING"] = "1"
 os.environ["PAYMENT_FAILURE_RATE"] = "0.0"
+# Keep rendered emails and log files out of the working tree
+_ARTIFACTS_DIR = tempfile.mkdtemp(prefix="marketplace-tests-")
+os.environ["EMAIL_NOTIFICATIONS_DIR"] = os.path.join(_ARTIFACTS_DIR, "email_notifications")
+os.environ["LOG_FILE"] = os.path.join(_ARTIFACTS_DIR, "logs", "app.log")
 
 from main import app
 from database import get_db
@@ -22,6 +28,8 @@ from repositories.users_repository import UsersRepository
 from repositories.services_repository import ServicesRepository
 from repositories.bookings_repository import BookingsRepository
 from auth import authenticate_user, create_access_token
+from services import bookings_service, payments_service
+import auth
 
 
 # Test database URL (using psycopg, not psycopg2)
@@ -110,6 +118,17 @@ def test_db():
             )
         """))
         
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS refunds (
+                id UUID PRIMARY KEY,
+                payment_id UUID NOT NULL REFERENCES payments(id),
+                status VARCHAR(20) NOT NULL CHECK (status IN ('pending', 'completed', 'failed')),
+                amount NUMERIC(10, 2) NOT NULL CHECK (amount > 0),
+                reason TEXT,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        
         conn.execute(text("""
             CREATE TABLE IF NOT EXISTS notifications (
                 id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -136,6 +155,43 @@ def test_db():
     engine.dispose()
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Process-wide caches outlive the per-test schema, so every test starts with them empty"""
+    bookings_service._booking_cache.clear()
+    payments_service._payment_cache.clear()
+    payments_service._booking_payment_cache.clear()
+    auth._rejected_tokens.clear()
+    yield
+
+
+@pytest.fixture
+def count_reads(monkeypatch):
+    """Wrap repository lookups so a test can see which (method, key) pairs reached the database"""
+    def install(repository, *method_names):
+        reads = []
+        for name in method_names:
+            original = getattr(repository, name)
+            def counting(key, _name=name, _original=original):
+                reads.append((_name, key))
+                return _original(key)
+            monkeypatch.setattr(repository, name, counting)
+        return reads
+    return install
+
+
+@pytest.fixture
+def cache_clock(monkeypatch):
+    """Swap module-level TTLCaches for empty ones on a fake clock; returns the clock's [now]"""
+    now = [0.0]
+    def install(module, *cache_names):
+        for name in cache_names:
+            cache = getattr(module, name)
+            monkeypatch.setattr(module, name, TTLCache(maxsize=cache.maxsize, ttl=cache.ttl, timer=lambda: now[0]))
+        return now
+    return install
+
+
 @pytest.fixture(scope="function")
 def client(test_db):
     """Create a test client"""
@@ -199,6 +199,115 @@ class TestServiceManagementAPI:
         
         assert response.status_code == 403
 
+    
+    def test_provider_create_services_batch(self, client, provider_token):
+        """Test provider can create several services in one request"""
+        response = client.post(
+            "/services/batch",
+            headers={"Authorization": f"Bearer {provider_token}"},
+            json=[
+                {
+                    "name": "Batch Service A",
+                    "description": "First batch service",
+                    "price": 40.0,
+                    "durationMinutes": 30,
+                    "availability": {"monday": ["09:00", "12:00"]}
+                },
+                {
+                    "name": "Batch Service B",
+                    "description": "Second batch service",
+                    "price": 80.0,
+                    "durationMinutes": 90,
+                    "availability": {}
+                }
+            ]
+        )
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert [s["name"] for s in data] == ["Batch Service A", "Batch Service B"]
+        for created in data:
+            assert client.get(f"/services/{created['id']}").status_code == 200
+    
+    def test_consumer_cannot_create_services_batch(self, client, consumer_token):
+        """Test consumer cannot create services in a batch"""
+        response = client.post(
+            "/services/batch",
+            headers={"Authorization": f"Bearer {consumer_token}"},
+            json=[{
+                "name": "Unauthorized Service",
+                "description": "Should fail",
+                "price": 50.0,
+                "durationMinutes": 60,
+                "availability": {}
+            }]
+        )
+        
+        assert response.status_code == 403
+    
+    def test_provider_delete_services_batch_skips_others(self, client, provider_token, other_provider_token, sample_service):
+        """Test batch delete only removes the caller's own services"""
+        others = client.post(
+            "/services/batch",
+            headers={"Authorization": f"Bearer {other_provider_token}"},
+            json=[{
+                "name": "Someone Else's Service",
+                "description": "Must survive",
+                "price": 20.0,
+                "durationMinutes": 30,
+                "availability": {}
+            }]
+        ).json()[0]
+        
+        response = client.delete(
+            "/services/batch",
+            params={"ids": [sample_service.id, others["id"]]},
+            headers={"Authorization": f"Bearer {provider_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == [sample_service.id]
+        assert client.get(f"/services/{sample_service.id}").status_code == 404
+        assert client.get(f"/services/{others['id']}").status_code == 200
+    
+    def test_consumer_cannot_delete_services_batch(self, client, consumer_token, sample_service):
+        """Test consumer cannot delete services in a batch"""
+        response = client.delete(
+            "/services/batch",
+            params={"ids": [sample_service.id]},
+            headers={"Authorization": f"Bearer {consumer_token}"}
+        )
+        
+        assert response.status_code == 403
+        assert client.get(f"/services/{sample_service.id}").status_code == 200
+
+    
+    def test_oversized_batches_are_rejected(self, client, provider_token, sample_service):
+        """Test batch create and delete refuse more than MAX_BATCH_SIZE items"""
+        from controllers.services_controller import MAX_BATCH_SIZE
+        service_json = {
+            "name": "Batch Service",
+            "description": "One of too many",
+            "price": 10.0,
+            "durationMinutes": 30,
+            "availability": {}
+        }
+        
+        create = client.post(
+            "/services/batch",
+            headers={"Authorization": f"Bearer {provider_token}"},
+            json=[service_json] * (MAX_BATCH_SIZE + 1)
+        )
+        delete = client.delete(
+            "/services/batch",
+            params={"ids": [sample_service.id] * (MAX_BATCH_SIZE + 1)},
+            headers={"Authorization": f"Bearer {provider_token}"}
+        )
+        
+        assert create.status_code == 400
+        assert delete.status_code == 400
+        assert client.get("/services/").json() == [client.get(f"/services/{sample_service.id}").json()]
+
 
 class TestBookingAPI:
     """Test booking API endpoints"""
@@ -312,6 +421,28 @@ class TestBookingAPI:
         
         assert response.status_code == 403
     
+    def test_filtered_list_excludes_others_bookings(self, client, other_consumer_token, sample_booking):
+        """Test a provider filter can't be used to list bookings the caller isn't part of"""
+        response = client.get(
+            "/bookings/",
+            params={"providerId": sample_booking.providerId},
+            headers={"Authorization": f"Bearer {other_consumer_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_filtered_list_includes_own_bookings(self, client, consumer_token, sample_booking):
+        """Test a participant still sees their booking through the same filter"""
+        response = client.get(
+            "/bookings/",
+            params={"providerId": sample_booking.providerId},
+            headers={"Authorization": f"Bearer {consumer_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert [b["id"] for b in response.json()] == [sample_booking.id]
+    
     def test_provider_can_view_their_service_booking(self, client, provider_token, sample_booking):
         """Test provider can view bookings for their services"""
         response = client.get(
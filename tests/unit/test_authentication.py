@@ -3,9 +3,12 @@ Unit tests for authentication functionality
 Tests JWT token generation, validation, and user authentication
 """
 import pytest
+import time
 from datetime import datetime, timedelta
+from jose import jwt
 from models import User, UserRole, UserProfile
-from auth import authenticate_user, create_access_token
+import auth
+from auth import authenticate_user, create_access_token, verify_token
 from repositories.users_repository import UsersRepository
 
 
@@ -78,3 +81,57 @@ class TestAuthentication:
         
         assert payload["sub"] == sample_consumer.email
         assert "exp" in payload
+
+
+class TestTokenVerification:
+    """Test verify_token and its cache of rejected tokens"""
+    
+    def _count_decodes(self, monkeypatch, **options):
+        decode = auth.jwt.decode
+        calls = []
+        def counting_decode(token, key, algorithms):
+            calls.append(token)
+            return decode(token, key, algorithms=algorithms, options=options)
+        monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+        return calls
+    
+    def test_valid_token_is_decoded_every_time(self, monkeypatch):
+        """Test valid tokens are never cached"""
+        calls = self._count_decodes(monkeypatch)
+        token = create_access_token({"sub": "consumer123@example.com"})
+        
+        assert verify_token(token)["sub"] == "consumer123@example.com"
+        assert verify_token(token)["sub"] == "consumer123@example.com"
+        assert len(calls) == 2
+    
+    def test_bad_signature_is_rejected_from_cache(self, monkeypatch):
+        """Test a token with a bad signature is only decoded once"""
+        calls = self._count_decodes(monkeypatch)
+        token = jwt.encode({"sub": "consumer123@example.com"}, "not-the-secret", algorithm=auth.ALGORITHM)
+        
+        assert verify_token(token) is None
+        assert verify_token(token) is None
+        assert len(calls) == 1
+    
+    def test_expired_token_is_rejected_from_cache(self, monkeypatch):
+        """Test an expired token is only decoded once"""
+        calls = self._count_decodes(monkeypatch)
+        token = create_access_token({"sub": "consumer123@example.com"}, expires_delta=timedelta(minutes=-1))
+        
+        assert verify_token(token) is None
+        assert verify_token(token) is None
+        assert len(calls) == 1
+    
+    def test_not_yet_valid_token_is_not_cached(self, monkeypatch):
+        """Test a token rejected for a future nbf is accepted once that time arrives"""
+        now = int(time.time())
+        token = jwt.encode(
+            {"sub": "consumer123@example.com", "nbf": now + 60, "exp": now + 600},
+            auth.SECRET_KEY, algorithm=auth.ALGORITHM
+        )
+        assert verify_token(token) is None
+        
+        # Later: leeway stands in for the clock moving past nbf
+        self._count_decodes(monkeypatch, leeway=120)
+        
+        assert verify_token(token)["sub"] == "consumer123@example.com"
@@ -140,7 +140,7 @@ class TestBookingAuthorization:
         users_repo = UsersRepository(test_db)
         booking_service = BookingsService(bookings_repo, services_repo, users_repo)
         
-        result = booking_service.delete_booking(sample_booking.id, "consumer123@example.com")
+        result = booking_service.delete_booking(sample_booking.id, sample_consumer)
         
         assert result is True
     
@@ -151,7 +151,7 @@ class TestBookingAuthorization:
         users_repo = UsersRepository(test_db)
         booking_service = BookingsService(bookings_repo, services_repo, users_repo)
         
-        result = booking_service.delete_booking(sample_booking.id, "provider123@example.com")
+        result = booking_service.delete_booking(sample_booking.id, sample_provider)
         
         assert result is True
     
@@ -162,7 +162,7 @@ class TestBookingAuthorization:
         users_repo = UsersRepository(test_db)
         booking_service = BookingsService(bookings_repo, services_repo, users_repo)
         
-        result = booking_service.delete_booking(sample_booking.id, "otherconsumer@example.com")
+        result = booking_service.delete_booking(sample_booking.id, other_consumer)
         
         assert result is False
     
@@ -173,7 +173,7 @@ class TestBookingAuthorization:
         users_repo = UsersRepository(test_db)
         booking_service = BookingsService(bookings_repo, services_repo, users_repo)
         
-        result = booking_service.delete_booking(sample_booking.id, "otherprovider@example.com")
+        result = booking_service.delete_booking(sample_booking.id, other_provider)
         
         assert result is False
 
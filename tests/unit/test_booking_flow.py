@@ -3,14 +3,36 @@ Unit tests for booking flow including payment processing
 Tests the complete booking creation flow with payment
 """
 import pytest
+import uuid
 from datetime import datetime, timedelta, timezone
-from models import BookingCreateRequest, PaymentRequest, PaymentMethod, BookingStatus
+from sqlalchemy import text
+from models import BookingCreateRequest, BookingUpdateRequest, PaymentRequest, PaymentMethod, RefundResponse, BookingStatus, NotificationType, Booking, User, UserRole, UserProfile
+from database import transaction
 from services.bookings_service import BookingsService
 from services.payments_service import PaymentsService
 from repositories.bookings_repository import BookingsRepository
 from repositories.services_repository import ServicesRepository
 from repositories.users_repository import UsersRepository
 from repositories.payments_repository import PaymentsRepository
+from services import bookings_service, notifications_service, payments_service
+
+
+def _pay(service, booking_id, monkeypatch):
+    """Record a successful payment for booking_id through the service"""
+    monkeypatch.setenv("PAYMENT_FAILURE_RATE", "0.0")
+    return service.process_payment(PaymentRequest(
+        bookingId=booking_id,
+        amount=100.0,
+        currency="USD",
+        paymentMethod=PaymentMethod(
+            type="card",
+            cardNumber="4111111111111111",
+            cardholderName="Jane Consumer",
+            expiryMonth=12,
+            expiryYear=2030,
+            cvv="123"
+        )
+    ))
 
 
 class TestBookingFlow:
@@ -51,7 +73,7 @@ class TestBookingFlow:
         import os
         os.environ["PAYMENT_FAILURE_RATE"] = "0.0"
         
-        result = booking_service.create_booking("consumer123@example.com", booking_request)
+        result = booking_service.create_booking(sample_consumer, booking_request)
         
         assert result is not None
         assert result.status == BookingStatus.CONFIRMED
@@ -59,8 +81,8 @@ class TestBookingFlow:
         assert result.customerId == sample_consumer.id
         assert result.serviceId == sample_service.id
     
-    def test_booking_fails_without_authentication(self, test_db, sample_service):
-        """Test booking fails for non-existent user"""
+    def test_booking_fails_for_unsaved_user(self, test_db, sample_service):
+        """Test booking fails for a user that does not exist in the database"""
         bookings_repo = BookingsRepository(test_db)
         services_repo = ServicesRepository(test_db)
         users_repo = UsersRepository(test_db)
@@ -90,9 +112,97 @@ class TestBookingFlow:
             payment=payment_request
         )
         
-        result = booking_service.create_booking("nonexistent@example.com", booking_request)
+        unsaved_user = User(
+            email="nonexistent@example.com",
+            password="password123",
+            role=UserRole.CUSTOMER,
+            profile=UserProfile(
+                firstName="Ghost",
+                lastName="User",
+                phone="+1234567899",
+                address="Nowhere"
+            )
+        )
+        
+        with pytest.raises(ValueError):
+            booking_service.create_booking(unsaved_user, booking_request)
+    
+    def test_failed_insert_only_rolls_back_its_savepoint(self, test_db, sample_consumer, sample_service):
+        """Test a repository integrity error leaves the caller's outer transaction intact"""
+        bookings_repo = BookingsRepository(test_db)
+        services_repo = ServicesRepository(test_db)
         
-        assert result is None
+        with transaction(test_db):
+            # Written in the outer transaction, not yet committed
+            services_repo.update_service(sample_service.id, {"price": 150.0})
+            
+            savepoint = test_db.begin_nested()
+            booking = Booking(
+                customerId=str(uuid.uuid4()),  # no such user
+                serviceId=sample_service.id,
+                providerId=sample_service.providerId,
+                status=BookingStatus.PENDING,
+                scheduledAt=datetime.now(timezone.utc) + timedelta(days=7),
+                duration=sample_service.durationMinutes,
+                totalAmount=sample_service.price,
+            )
+            with pytest.raises(ValueError):
+                bookings_repo.create_booking(booking)
+            savepoint.rollback()
+        
+        # The outer write survived the failed insert and was committed
+        assert services_repo.get_service(sample_service.id).price == 150.0
+    
+    def test_failed_notification_does_not_lose_booking(self, test_db, sample_consumer, sample_service, monkeypatch):
+        """Test a notification insert that aborts the transaction can't roll back the committed booking"""
+        bookings_repo = BookingsRepository(test_db)
+        booking_service = BookingsService(bookings_repo, ServicesRepository(test_db), UsersRepository(test_db))
+        
+        def failing_insert(notification):
+            test_db.execute(text("SELECT 1/0"))
+        monkeypatch.setattr(booking_service.notifications_service.repository, "create_notification", failing_insert)
+        monkeypatch.setenv("PAYMENT_FAILURE_RATE", "0.0")
+        
+        booking_request = BookingCreateRequest(
+            serviceId=sample_service.id,
+            scheduledAt=datetime.now(timezone.utc) + timedelta(days=7),
+            payment=PaymentRequest(
+                bookingId="temp",
+                amount=sample_service.price,
+                currency="USD",
+                paymentMethod=PaymentMethod(
+                    type="card",
+                    cardNumber="4111111111111111",
+                    cardholderName="Jane Consumer",
+                    expiryMonth=12,
+                    expiryYear=2030,
+                    cvv="123"
+                )
+            )
+        )
+        
+        result = booking_service.create_booking(sample_consumer, booking_request)
+        
+        assert result is not None
+        stored = bookings_repo.get_booking(result.id)
+        assert stored is not None
+        assert stored.status == BookingStatus.CONFIRMED
+    
+    def test_failed_notification_does_not_lose_update(self, test_db, sample_consumer, sample_booking, monkeypatch):
+        """Test a notification failure after a status change leaves the update committed"""
+        bookings_repo = BookingsRepository(test_db)
+        booking_service = BookingsService(bookings_repo, ServicesRepository(test_db), UsersRepository(test_db))
+        
+        def failing_insert(notification):
+            test_db.execute(text("SELECT 1/0"))
+        monkeypatch.setattr(booking_service.notifications_service.repository, "create_notification", failing_insert)
+        
+        result = booking_service.update_booking(
+            sample_booking.id, BookingUpdateRequest(status=BookingStatus.CANCELLED), sample_consumer
+        )
+        
+        assert result is not None
+        assert bookings_repo.get_booking(sample_booking.id).status == BookingStatus.CANCELLED
     
     def test_booking_fails_for_nonexistent_service(self, test_db, sample_consumer):
         """Test booking fails for non-existent service"""
@@ -125,7 +235,7 @@ class TestBookingFlow:
             payment=payment_request
         )
         
-        result = booking_service.create_booking("consumer123@example.com", booking_request)
+        result = booking_service.create_booking(sample_consumer, booking_request)
         
         assert result is None
     
@@ -164,7 +274,7 @@ class TestBookingFlow:
         import os
         os.environ["PAYMENT_FAILURE_RATE"] = "1.0"
         
-        result = booking_service.create_booking("consumer123@example.com", booking_request)
+        result = booking_service.create_booking(sample_consumer, booking_request)
         
         # Reset failure rate
         os.environ["PAYMENT_FAILURE_RATE"] = "0.1"
@@ -206,11 +316,112 @@ class TestBookingFlow:
         import os
         os.environ["PAYMENT_FAILURE_RATE"] = "0.0"
         
-        result = booking_service.create_booking("consumer123@example.com", booking_request)
+        result = booking_service.create_booking(sample_consumer, booking_request)
         
         assert result is not None
         assert result.duration == sample_service.durationMinutes
 
+    
+    @pytest.mark.parametrize("failure_rate", ["0.0", "1.0"])
+    def test_payment_notification_waits_for_booking_commit(self, test_db, sample_consumer, sample_service, monkeypatch, failure_rate):
+        """Test the payment notification is only dispatched for a committed booking"""
+        booking_service = BookingsService(BookingsRepository(test_db), ServicesRepository(test_db), UsersRepository(test_db))
+        
+        submit = notifications_service._notification_pool.submit
+        submitted = []
+        def recording_submit(*args):
+            # Depth 0 means the booking transaction has already committed
+            submitted.append((test_db.info.get("transaction_depth", 0), submit(*args)))
+            return submitted[-1][1]
+        monkeypatch.setattr(notifications_service._notification_pool, "submit", recording_submit)
+        monkeypatch.setenv("PAYMENT_FAILURE_RATE", failure_rate)
+        
+        booking_request = BookingCreateRequest(
+            serviceId=sample_service.id,
+            scheduledAt=datetime.now(timezone.utc) + timedelta(days=7),
+            payment=PaymentRequest(
+                bookingId="temp",
+                amount=sample_service.price,
+                currency="USD",
+                paymentMethod=PaymentMethod(
+                    type="card",
+                    cardNumber="4111111111111111",
+                    cardholderName="Jane Consumer",
+                    expiryMonth=12,
+                    expiryYear=2030,
+                    cvv="123"
+                )
+            )
+        )
+        
+        result = booking_service.create_booking(sample_consumer, booking_request)
+        for _, future in submitted:
+            future.result(timeout=10)
+        payment_notifications = test_db.execute(
+            text("SELECT type FROM notifications WHERE type IN (:success, :failed)"),
+            {"success": NotificationType.PAYMENT_SUCCESS.value, "failed": NotificationType.PAYMENT_FAILED.value}
+        ).scalars().all()
+        
+        if failure_rate == "1.0":
+            # The rolled-back payment never announces itself
+            assert result is None
+            assert submitted == []
+            assert payment_notifications == []
+        else:
+            # Written through the caller's engine, after the booking committed
+            assert result is not None
+            assert [depth for depth, _ in submitted] == [0]
+            assert payment_notifications == [NotificationType.PAYMENT_SUCCESS.value]
+
+
+
+class TestBookingCache:
+    """Test the process-wide booking read cache"""
+    
+    def test_repeat_read_is_served_from_cache(self, test_db, sample_booking, count_reads):
+        """Test a second read of the same booking doesn't hit the database"""
+        booking_service = BookingsService(BookingsRepository(test_db), ServicesRepository(test_db), UsersRepository(test_db))
+        reads = count_reads(booking_service.bookings_repo, "get_booking")
+        
+        first = booking_service.get_booking(sample_booking.id)
+        second = booking_service.get_booking(sample_booking.id)
+        
+        assert first.id == second.id == sample_booking.id
+        assert reads == [("get_booking", sample_booking.id)]
+    
+    def test_update_evicts_cached_booking(self, test_db, sample_consumer, sample_booking):
+        """Test a status change made through the service is visible on the next read"""
+        booking_service = BookingsService(BookingsRepository(test_db), ServicesRepository(test_db), UsersRepository(test_db))
+        assert booking_service.get_booking(sample_booking.id).status == BookingStatus.CONFIRMED
+        
+        booking_service.update_booking(sample_booking.id, BookingUpdateRequest(status=BookingStatus.CANCELLED), sample_consumer)
+        
+        assert booking_service.get_booking(sample_booking.id).status == BookingStatus.CANCELLED
+    
+    def test_delete_evicts_cached_booking(self, test_db, sample_consumer, sample_booking):
+        """Test a deleted booking is no longer served from the cache"""
+        booking_service = BookingsService(BookingsRepository(test_db), ServicesRepository(test_db), UsersRepository(test_db))
+        booking_service.get_booking(sample_booking.id)
+        
+        assert booking_service.delete_booking(sample_booking.id, sample_consumer)
+        
+        assert booking_service.get_booking(sample_booking.id) is None
+    
+    def test_cached_booking_expires(self, test_db, sample_booking, count_reads, cache_clock):
+        """Test an entry is re-read from the database once its TTL has passed"""
+        now = cache_clock(bookings_service, "_booking_cache")
+        booking_service = BookingsService(BookingsRepository(test_db), ServicesRepository(test_db), UsersRepository(test_db))
+        reads = count_reads(booking_service.bookings_repo, "get_booking")
+        
+        booking_service.get_booking(sample_booking.id)
+        now[0] = 29.0
+        booking_service.get_booking(sample_booking.id)
+        assert len(reads) == 1
+        
+        now[0] = 31.0
+        booking_service.get_booking(sample_booking.id)
+        assert len(reads) == 2
+
 
 class TestPaymentProcessing:
     """Test payment processing"""
@@ -278,3 +489,111 @@ class TestPaymentProcessing:
         assert result.status == "failed"
         assert result.failureReason is not None
 
+
+class TestPaymentCache:
+    """Test the short-TTL payment read caches"""
+    
+    def test_repeat_status_read_is_served_from_cache(self, test_db, sample_booking, monkeypatch, count_reads):
+        """Test polling a payment's status only reads it from the database once"""
+        service = PaymentsService(PaymentsRepository(test_db))
+        reads = count_reads(service.payments_repo, "get_payment", "get_payment_by_booking")
+        payment = _pay(service, sample_booking.id, monkeypatch)
+        
+        assert service.get_payment_status(payment.id).status == "completed"
+        assert service.get_payment_status(payment.id).status == "completed"
+        assert service.get_payment_by_booking(sample_booking.id).id == payment.id
+        assert service.get_payment_by_booking(sample_booking.id).id == payment.id
+        
+        assert reads == [("get_payment", payment.id), ("get_payment_by_booking", sample_booking.id)]
+    
+    def test_missing_payment_is_not_cached(self, test_db, sample_booking, monkeypatch):
+        """Test a miss is re-read, so a payment made afterwards is seen straight away"""
+        service = PaymentsService(PaymentsRepository(test_db))
+        
+        assert service.get_payment_by_booking(sample_booking.id) is None
+        payment = _pay(service, sample_booking.id, monkeypatch)
+        
+        assert service.get_payment_by_booking(sample_booking.id).id == payment.id
+    
+    def test_new_payment_evicts_booking_entry(self, test_db, sample_booking, monkeypatch, count_reads):
+        """Test a payment made through the service invalidates its booking's cached payment"""
+        service = PaymentsService(PaymentsRepository(test_db))
+        reads = count_reads(service.payments_repo, "get_payment", "get_payment_by_booking")
+        _pay(service, sample_booking.id, monkeypatch)
+        service.get_payment_by_booking(sample_booking.id)
+        
+        _pay(service, sample_booking.id, monkeypatch)
+        service.get_payment_by_booking(sample_booking.id)
+        
+        assert reads == [("get_payment_by_booking", sample_booking.id)] * 2
+    
+    def test_cached_payment_expires(self, test_db, sample_booking, monkeypatch, count_reads, cache_clock):
+        """Test both caches re-read from the database once their TTL has passed"""
+        now = cache_clock(payments_service, "_payment_cache", "_booking_payment_cache")
+        service = PaymentsService(PaymentsRepository(test_db))
+        reads = count_reads(service.payments_repo, "get_payment", "get_payment_by_booking")
+        payment = _pay(service, sample_booking.id, monkeypatch)
+        
+        service.get_payment_status(payment.id)
+        service.get_payment_by_booking(sample_booking.id)
+        now[0] = 4.0
+        service.get_payment_status(payment.id)
+        service.get_payment_by_booking(sample_booking.id)
+        assert len(reads) == 2
+        
+        now[0] = 6.0
+        service.get_payment_status(payment.id)
+        service.get_payment_by_booking(sample_booking.id)
+        assert len(reads) == 4
+
+
+class TestRefunds:
+    """Test refund processing"""
+    
+    def test_refund_marks_payment_refunded(self, test_db, sample_booking, monkeypatch):
+        """Test a refund is recorded and flips the payment to refunded"""
+        service = PaymentsService(PaymentsRepository(test_db))
+        payment = _pay(service, sample_booking.id, monkeypatch)
+        
+        refund = service.process_refund(payment.id, reason="Changed plans")
+        
+        assert refund is not None
+        assert refund.paymentId == payment.id
+        assert refund.amount == payment.amount
+        assert refund.reason == "Changed plans"
+        assert service.payments_repo.get_payment(payment.id).status == "refunded"
+        assert [r.id for r in service.get_refunds(payment.id)] == [refund.id]
+    
+    def test_second_refund_returns_none(self, test_db, sample_booking, monkeypatch):
+        """Test a payment can only be refunded once"""
+        service = PaymentsService(PaymentsRepository(test_db))
+        payment = _pay(service, sample_booking.id, monkeypatch)
+        
+        assert service.process_refund(payment.id) is not None
+        assert service.process_refund(payment.id) is None
+        assert len(service.get_refunds(payment.id)) == 1
+    
+    def test_refund_and_mark_skips_already_refunded_payment(self, test_db, sample_booking, monkeypatch):
+        """Test the single-statement guard when a concurrent refund got there first"""
+        payments_repo = PaymentsRepository(test_db)
+        payment = _pay(PaymentsService(payments_repo), sample_booking.id, monkeypatch)
+        
+        with transaction(test_db):
+            first = payments_repo.refund_and_mark(RefundResponse(paymentId=payment.id, status="completed", amount=payment.amount))
+            second = payments_repo.refund_and_mark(RefundResponse(paymentId=payment.id, status="completed", amount=payment.amount))
+        
+        assert first is not None
+        assert second is None
+        assert len(payments_repo.get_refunds_by_payment(payment.id)) == 1
+    
+    def test_refund_evicts_cached_status(self, test_db, sample_booking, monkeypatch):
+        """Test a cached payment status reflects the refund straight away"""
+        service = PaymentsService(PaymentsRepository(test_db))
+        payment = _pay(service, sample_booking.id, monkeypatch)
+        assert service.get_payment_status(payment.id).status == "completed"
+        assert service.get_payment_by_booking(sample_booking.id).status == "completed"
+        
+        service.process_refund(payment.id)
+        
+        assert service.get_payment_status(payment.id).status == "refunded"
+        assert service.get_payment_by_booking(sample_booking.id).status == "refunded"
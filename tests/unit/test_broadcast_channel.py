@@ -0,0 +1,87 @@
+"""
+Unit tests for the per-user SSE broadcast channels
+Tests buffering, reader wake-up and channel lifetime
+"""
+import asyncio
+import pytest
+from services import broadcast_channel
+from services.broadcast_channel import BroadcastChannel
+
+
+@pytest.fixture
+def channels(monkeypatch):
+    """An empty channel registry, so tests don't see each other's subscribers"""
+    registry = {}
+    monkeypatch.setattr(broadcast_channel, "_CHANNELS", registry)
+    return registry
+
+
+class TestBroadcastChannel:
+    """Test the buffer and the reader wake-up"""
+
+    def test_overflow_drops_oldest_messages(self):
+        """Test a full buffer evicts from the front and a lagging reader skips what was evicted"""
+        async def scenario():
+            channel = BroadcastChannel(maxlen=3)
+            for message in range(5):
+                channel.publish_nowait(message)
+            return await channel.read(0, timeout=0.1), await channel.read(3, timeout=0.1)
+
+        assert asyncio.run(scenario()) == ((5, [2, 3, 4]), (5, [3, 4]))
+
+    def test_publish_wakes_every_waiting_reader(self):
+        """Test one publish wakes all readers blocked on the current event"""
+        async def scenario():
+            channel = BroadcastChannel()
+            readers = [asyncio.create_task(channel.read(0, timeout=1)) for _ in range(2)]
+            await asyncio.sleep(0)
+            assert not any(reader.done() for reader in readers)
+
+            channel.publish_nowait("hello")
+            return await asyncio.gather(*readers)
+
+        assert asyncio.run(scenario()) == [(1, ["hello"]), (1, ["hello"])]
+
+    def test_caught_up_reader_waits_for_next_publish(self):
+        """Test the event is swapped on publish, so a reader that caught up blocks again"""
+        async def scenario():
+            channel = BroadcastChannel()
+            channel.publish_nowait("first")
+            seq, _ = await channel.read(0, timeout=0.1)
+
+            with pytest.raises(asyncio.TimeoutError):
+                await channel.read(seq, timeout=0.05)
+
+            reader = asyncio.create_task(channel.read(seq, timeout=1))
+            await asyncio.sleep(0)
+            await channel.publish("second")
+            return await reader
+
+        assert asyncio.run(scenario()) == (2, ["second"])
+
+
+class TestChannelRegistry:
+    """Test subscribe/unsubscribe bookkeeping"""
+
+    def test_unsubscribing_last_reader_removes_channel(self, channels):
+        """Test a channel lives exactly as long as its readers"""
+        first = broadcast_channel.subscribe("user-1")
+        second = broadcast_channel.subscribe("user-1")
+        assert first is second
+        assert first.readers == 2
+
+        broadcast_channel.unsubscribe("user-1")
+        assert broadcast_channel.get_channel("user-1") is first
+
+        broadcast_channel.unsubscribe("user-1")
+        assert broadcast_channel.get_channel("user-1") is None
+        assert channels == {}
+
+        # A later subscriber starts a fresh channel
+        assert broadcast_channel.subscribe("user-1") is not first
+
+    def test_unsubscribe_unknown_user_is_ignored(self, channels):
+        """Test unsubscribing a user without a channel is a no-op"""
+        broadcast_channel.unsubscribe("nobody")
+
+        assert channels == {}
@@ -0,0 +1,113 @@
+"""
+Unit tests for the file-backed email service
+Tests template rendering and the email history index
+"""
+import os
+import pytest
+import orjson
+from pathlib import Path
+from models import User, UserRole, UserProfile
+from services import email_service
+from services.email_service import EmailService
+
+
+def _user(email: str = "jane@example.com") -> User:
+    return User(
+        email=email,
+        password="password123",
+        role=UserRole.CUSTOMER,
+        profile=UserProfile(
+            firstName="Jane",
+            lastName="Consumer",
+            phone="+1234567890",
+            address="123 Consumer St"
+        )
+    )
+
+
+class TestTemplates:
+    """Test template compilation and its bytecode cache"""
+
+    def test_bytecode_cache_lives_under_output_dir(self, tmp_path):
+        """Test compiled templates are cached in the instance's own output directory"""
+        output_dir = tmp_path / "outbox"
+        service = EmailService(str(output_dir))
+
+        path = service.send_password_reset_confirmation(_user())
+
+        assert "Jane" in Path(path).read_text()
+        cache_dir = output_dir / ".jinja_cache"
+        assert cache_dir.is_dir()
+        assert any(cache_dir.iterdir())
+
+
+class TestEmailWrites:
+    """Test emails are written out whole"""
+
+    def test_short_writes_are_retried(self, tmp_path, monkeypatch):
+        """Test a write that only takes part of the buffer is continued, not silently truncated"""
+        write = os.write
+        monkeypatch.setattr(email_service.os, "write", lambda fd, data: write(fd, bytes(data[:7])))
+        service = EmailService(str(tmp_path))
+
+        path = service.send_password_reset_confirmation(_user())
+
+        monkeypatch.undo()
+        content = Path(path).read_text()
+        assert "Jane" in content
+        assert content.rstrip().endswith("</html>")
+        assert orjson.loads(Path(path).with_suffix(".json").read_bytes())["content"] == content
+        assert [e["content"] for e in service.get_email_history()] == [content]
+
+    def test_failed_write_raises(self, tmp_path, monkeypatch):
+        """Test a write error propagates, so send_in_background logs it"""
+        def failing_write(fd, data):
+            raise OSError(28, "No space left on device")
+        monkeypatch.setattr(email_service.os, "write", failing_write)
+        service = EmailService(str(tmp_path))
+
+        with pytest.raises(OSError):
+            service.send_password_reset_confirmation(_user())
+
+
+class TestEmailHistory:
+    """Test reading email history back, newest first"""
+
+    def test_history_reads_index_newest_first(self, tmp_path):
+        """Test history comes from the index, filtered by recipient and limited"""
+        service = EmailService(str(tmp_path))
+        service.send_password_reset_confirmation(_user("jane@example.com"))
+        service.send_password_reset_confirmation(_user("john@example.com"))
+        service.send_password_reset_email(_user("jane@example.com"), "token")
+
+        assert [e["to"] for e in service.get_email_history()] == ["jane@example.com", "john@example.com", "jane@example.com"]
+        assert [e["type"] for e in service.get_email_history("jane@example.com")] == ["password_reset", "password_reset_confirmation"]
+        assert len(service.get_email_history("jane@example.com", limit=1)) == 1
+
+    def test_history_falls_back_to_email_files_without_index(self, tmp_path):
+        """Test a directory written before the index existed still reports its emails"""
+        for name, to, timestamp in (
+            ("older", "jane@example.com", "2024-01-01T09:00:00+00:00"),
+            ("newer", "jane@example.com", "2024-01-02T09:00:00+00:00"),
+            ("other", "john@example.com", "2024-01-03T09:00:00+00:00"),
+        ):
+            (tmp_path / f"{name}.json").write_bytes(orjson.dumps({"to": to, "subject": name, "timestamp": timestamp}))
+        service = EmailService(str(tmp_path))
+
+        assert [e["subject"] for e in service.get_email_history()] == ["other", "newer", "older"]
+        assert [e["subject"] for e in service.get_email_history("jane@example.com")] == ["newer", "older"]
+        assert [e["subject"] for e in service.get_email_history("jane@example.com", limit=1)] == ["newer"]
+
+    def test_history_skips_undecodable_lines(self, tmp_path):
+        """Test a corrupt line or a partially written trailing line doesn't break the history"""
+        service = EmailService(str(tmp_path))
+        service.send_password_reset_confirmation(_user("jane@example.com"))
+        with open(service.history_path, "ab") as index:
+            index.write(b'\xff\xfe not json "to":"jane@example.com"\n')
+        service.send_password_reset_email(_user("jane@example.com"), "token")
+        with open(service.history_path, "ab") as index:
+            index.write(b'{"to":"jane@example.com","subj')
+
+        history = service.get_email_history("jane@example.com")
+
+        assert [e["type"] for e in history] == ["password_reset", "password_reset_confirmation"]
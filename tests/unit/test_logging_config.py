@@ -0,0 +1,77 @@
+"""
+Unit tests for logging helpers
+Tests the per-event throttle on repeated warnings
+"""
+from types import SimpleNamespace
+import pytest
+import logging_config
+from logging_config import log_throttled
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, event, **kwargs):
+        self.warnings.append((event, kwargs))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock and fresh buckets for each test"""
+    now = [100.0]
+    monkeypatch.setattr(logging_config, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(logging_config, "_throttle_buckets", {})
+    return now
+
+
+class TestLogThrottled:
+    """Test the token bucket behind log_throttled"""
+
+    def test_burst_over_rate_is_suppressed(self, clock):
+        """Test only per_second warnings get through a burst within the window"""
+        logger = RecordingLogger()
+
+        for attempt in range(5):
+            log_throttled(logger, "Redis unavailable", per_second=2, attempt=attempt)
+
+        assert logger.warnings == [
+            ("Redis unavailable", {"attempt": 0}),
+            ("Redis unavailable", {"attempt": 1}),
+        ]
+
+    def test_next_warning_reports_suppressed_count(self, clock):
+        """Test the first warning after the window refills carries how many were dropped"""
+        logger = RecordingLogger()
+        for _ in range(5):
+            log_throttled(logger, "Redis unavailable", per_second=2)
+
+        clock[0] += 1.0
+        log_throttled(logger, "Redis unavailable", per_second=2)
+        log_throttled(logger, "Redis unavailable", per_second=2)
+
+        assert logger.warnings[2:] == [
+            ("Redis unavailable", {"suppressed": 3}),
+            ("Redis unavailable", {}),
+        ]
+
+    def test_refill_is_capped_at_rate(self, clock):
+        """Test a long quiet period doesn't bank more than one second's worth of warnings"""
+        logger = RecordingLogger()
+        log_throttled(logger, "Redis unavailable", per_second=2)
+
+        clock[0] += 60.0
+        for _ in range(5):
+            log_throttled(logger, "Redis unavailable", per_second=2)
+
+        assert len(logger.warnings) == 3
+
+    def test_events_are_throttled_independently(self, clock):
+        """Test one noisy event doesn't suppress a different one"""
+        logger = RecordingLogger()
+        for _ in range(3):
+            log_throttled(logger, "Redis unavailable", per_second=1)
+
+        log_throttled(logger, "Email notification failed", per_second=1)
+
+        assert [event for event, _ in logger.warnings] == ["Redis unavailable", "Email notification failed"]
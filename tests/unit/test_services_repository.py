@@ -0,0 +1,44 @@
+"""
+Unit tests for the services repository
+Tests partial updates only touch the columns they are given
+"""
+import pytest
+from sqlalchemy import text
+from models import ServiceAvailability
+from database import transaction
+from repositories.services_repository import ServicesRepository
+
+
+class TestServiceUpdates:
+    """Test partial service updates"""
+    
+    def test_price_only_update_leaves_other_columns(self, test_db, sample_service):
+        """Test updating just the price keeps every other column as it was"""
+        services_repo = ServicesRepository(test_db)
+        before = services_repo.get_service(sample_service.id)
+        
+        with transaction(test_db):
+            updated = services_repo.update_service(sample_service.id, {"price": 99.5})
+        after = services_repo.get_service(sample_service.id)
+        
+        assert updated.price == after.price == 99.5
+        unchanged = {"price", "updatedAt"}
+        assert after.model_dump(exclude=unchanged) == before.model_dump(exclude=unchanged)
+    
+    @pytest.mark.parametrize("availability", [
+        {"monday": ["10:00", "12:00"]},
+        ServiceAvailability(monday=["10:00", "12:00"]),
+    ])
+    def test_availability_update_is_stored_as_json(self, test_db, sample_service, availability):
+        """Test a dict and a ServiceAvailability are written the same way as on create"""
+        services_repo = ServicesRepository(test_db)
+        
+        with transaction(test_db):
+            services_repo.update_service(sample_service.id, {"availability": availability})
+        
+        stored = test_db.execute(
+            text("SELECT jsonb_typeof(availability), availability->'monday' FROM services WHERE id = :id"),
+            {"id": sample_service.id}
+        ).one()
+        assert tuple(stored) == ("object", ["10:00", "12:00"])
+        assert services_repo.get_service(sample_service.id).availability.monday == ["10:00", "12:00"]